@@ -1,7 +1,31 @@
-from typing import Dict
+from collections import OrderedDict, UserDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import instrument
+
+
+class _RuleMap(UserDict):
+    """
+    A dict that counts its mutations, so compiled matchers know when to
+    rebuild. Every MutableMapping method goes through __setitem__ or
+    __delitem__; only |=, which UserDict applies to the backing dict
+    directly, needs its own hook.
+    """
+    version = 0
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.version += 1
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.version += 1
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
 
 # Define keyword-category mapping
-KEYWORD_CATEGORY_MAP: Dict[str, str] = {
+KEYWORD_CATEGORY_MAP: Dict[str, str] = _RuleMap({
     'uber': 'Transport',
     'taxi': 'Transport',
     'bus': 'Transport',
@@ -24,15 +48,155 @@ KEYWORD_CATEGORY_MAP: Dict[str, str] = {
     'doctor': 'Health',
     'pharmacy': 'Health',
     # Add more as needed
-}
+})
+
+# User-defined rules; these take precedence over the built-in map.
+USER_KEYWORD_MAP: Dict[str, str] = _RuleMap()
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a keyword -> category map.
+
+    One pass over the text finds every keyword occurrence, so matching costs
+    O(len(text)) however many keywords there are. When several keywords
+    occur, the longest wins; among equally long ones the earliest in the
+    text wins.
+    """
+
+    def __init__(self, keyword_map: Dict[str, str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # Longest keyword that is a suffix of each node: (length, -order, category)
+        self.best: List[Optional[Tuple[int, int, str]]] = [None]
+        for order, (keyword, category) in enumerate(keyword_map.items()):
+            keyword = keyword.lower()
+            if not keyword:
+                continue
+            node = 0
+            for ch in keyword:
+                child = self.goto[node].get(ch)
+                if child is None:
+                    child = len(self.goto)
+                    self.goto[node][ch] = child
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.best.append(None)
+                node = child
+            if self.best[node] is None:
+                self.best[node] = (len(keyword), -order, category)
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for ch, child in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                if self.best[child] is None:
+                    self.best[child] = self.best[self.fail[child]]
+                queue.append(child)
+
+    def match(self, text: str) -> Optional[str]:
+        goto, fail, best = self.goto, self.fail, self.best
+        node = 0
+        winner = None
+        winner_key = None
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            found = best[node]
+            if found is not None:
+                length, neg_order, category = found
+                key = (length, length - i, neg_order)  # longer, then earlier start
+                if winner_key is None or key > winner_key:
+                    winner_key = key
+                    winner = category
+        return winner
+
+class TagCache:
+    """Bounded LRU cache of normalized description -> category."""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.entries: 'OrderedDict[str, str]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
 
+    def get(self, key: str) -> Optional[str]:
+        category = self.entries.get(key)
+        if category is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return category
+
+    def put(self, key: str, category: str):
+        self.entries[key] = category
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+_cache = TagCache()
+_matchers: Tuple[Optional[KeywordMatcher], Optional[KeywordMatcher]] = (None, None)
+_rules_source: Optional[Tuple] = None
+
+def _rules_version() -> Tuple:
+    return (id(USER_KEYWORD_MAP), getattr(USER_KEYWORD_MAP, 'version', 0),
+            id(KEYWORD_CATEGORY_MAP), getattr(KEYWORD_CATEGORY_MAP, 'version', 0))
+
+def get_matchers() -> Tuple[KeywordMatcher, KeywordMatcher]:
+    """
+    Return the (user rules, built-in rules) matchers, recompiling them and
+    dropping cached tags whenever either map changed.
+    """
+    global _matchers, _rules_source
+    source = _rules_version()
+    if source != _rules_source:
+        _matchers = (KeywordMatcher(USER_KEYWORD_MAP), KeywordMatcher(KEYWORD_CATEGORY_MAP))
+        _rules_source = source
+        _cache.clear()
+    return _matchers
+
+def normalize_description(description: str) -> str:
+    return ' '.join(description.lower().split())
+
+def _tag(normalized: str, user: KeywordMatcher, builtin: KeywordMatcher) -> str:
+    category = _cache.get(normalized)
+    if category is None:
+        category = user.match(normalized) or builtin.match(normalized) or 'Other'
+        _cache.put(normalized, category)
+    return category
+
+@instrument.timed()
 def auto_tag_category(description: str) -> str:
     """
     Suggest a category based on keywords in the description.
     Returns 'Other' if no keyword matches.
     """
-    desc = description.lower()
-    for keyword, category in KEYWORD_CATEGORY_MAP.items():
-        if keyword in desc:
-            return category
-    return 'Other' 
\ No newline at end of file
+    return _tag(normalize_description(description), *get_matchers())
+
+@instrument.timed()
+def auto_tag_many(descriptions: Iterable[str]) -> List[str]:
+    """Tag a batch of descriptions, e.g. an imported statement."""
+    user, builtin = get_matchers()
+    return [_tag(normalize_description(desc), user, builtin) for desc in descriptions]
+
+def add_rule(keyword: str, category: str):
+    USER_KEYWORD_MAP[keyword.lower()] = category
+
+def remove_rule(keyword: str):
+    USER_KEYWORD_MAP.pop(keyword.lower(), None)
+
+def cache_info() -> Dict[str, int]:
+    return {
+        'hits': _cache.hits,
+        'misses': _cache.misses,
+        'size': len(_cache.entries),
+        'maxsize': _cache.maxsize
+    }
+
+def clear_cache():
+    _cache.clear()
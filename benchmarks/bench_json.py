@@ -0,0 +1,62 @@
+"""
+Load and save timings for the JSON data file.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_json --records 100000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.generate import build_manager
+from models import JSON_BACKEND, LedgerManager
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def legacy_save(manager: LedgerManager, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manager.to_dict(), f, indent=4)
+
+
+def legacy_load(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    LedgerManager().load_from_dict(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000, help='number of transactions')
+    args = parser.parse_args()
+
+    manager = build_manager(args.records)
+    per_100k = 100000 / args.records
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'legacy.json')
+        path = os.path.join(tmp, 'data.json')
+        rows = [
+            ('indent=4 json save', timed(lambda: legacy_save(manager, legacy_path))),
+            ('indent=4 json load', timed(lambda: legacy_load(legacy_path))),
+            (f'{JSON_BACKEND} save', timed(lambda: manager.save_to_json(path))),
+            (f'{JSON_BACKEND} load', timed(lambda: LedgerManager().load_from_json(path, stream=False))),
+            ('streaming load', timed(lambda: LedgerManager().load_from_json(path, stream=True))),
+        ]
+        legacy_size = os.path.getsize(legacy_path)
+        size = os.path.getsize(path)
+
+    print(f'{args.records} transactions, {args.records // 10} ledger entries')
+    print(f'file size: {legacy_size / 1e6:.1f} MB indented, {size / 1e6:.1f} MB compact')
+    for name, seconds in rows:
+        print(f'{name:<22} {seconds * per_100k:7.3f} s per 100k records')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Memory held by loaded records: plain __dict__ classes versus the slotted
+models, and then a whole loaded LedgerManager with its indexes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_memory --records 100000
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from benchmarks.generate import build_manager
+from models import LedgerManager, Transaction, PersonLedgerEntry
+
+
+class DictTransaction:
+    """The record layout before slots: ISO date strings and a per-instance __dict__."""
+
+    def __init__(self, amount, date, description, category, trans_type):
+        self.amount = amount
+        self.date = date
+        self.description = description
+        self.category = category
+        self.trans_type = trans_type
+        self.id = None
+
+
+class DictLedgerEntry:
+    def __init__(self, name, amount, description, date, entry_type):
+        self.name = name
+        self.amount = amount
+        self.description = description
+        self.date = date
+        self.entry_type = entry_type
+        self.id = None
+
+
+def measure(raw: str, transaction_cls, entry_cls) -> int:
+    """Bytes still allocated once every record is built from `raw` and the decoded JSON is dropped."""
+    gc.collect()
+    tracemalloc.start()
+    data = json.loads(raw)
+    records = []
+    for t in data['transactions']:
+        record = transaction_cls(t['amount'], t['date'], t['description'], t['category'], t['trans_type'])
+        record.id = t['id']
+        records.append(record)
+    for e in data['ledger_entries']:
+        record = entry_cls(e['name'], e['amount'], e['description'], e['date'], e['entry_type'])
+        record.id = e['id']
+        records.append(record)
+    del data
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def measure_manager(raw: str) -> tuple:
+    """
+    Bytes held by a LedgerManager loaded from `raw`, indexes included:
+    straight after the load, and once a search has built the description
+    index.
+    """
+    gc.collect()
+    tracemalloc.start()
+    manager = LedgerManager()
+    manager.load_from_dict(json.loads(raw))
+    gc.collect()
+    loaded = tracemalloc.get_traced_memory()[0]
+    manager.search('pay')
+    gc.collect()
+    searched = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return loaded, searched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000, help='number of transactions')
+    args = parser.parse_args()
+
+    raw = json.dumps(build_manager(args.records).to_dict())
+    count = args.records + args.records // 10
+    for name, transaction_cls, entry_cls in (
+        ('__dict__ records', DictTransaction, DictLedgerEntry),
+        ('slotted records', Transaction, PersonLedgerEntry),
+    ):
+        size = measure(raw, transaction_cls, entry_cls)
+        print(f'{name:<18} {size / 1e6:8.1f} MB  {size / count:6.1f} bytes per record')
+    for name, size in zip(('loaded manager', 'after a search'), measure_manager(raw)):
+        print(f'{name:<18} {size / 1e6:8.1f} MB  {size / count:6.1f} bytes per record')
+
+
+if __name__ == '__main__':
+    main()
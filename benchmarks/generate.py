@@ -0,0 +1,63 @@
+"""
+Deterministic synthetic ledgers for the benchmarks.
+
+The same (count, seed) always yields the same records, so timings from
+different revisions are measured on identical data.
+"""
+import random
+from datetime import date
+from typing import Iterator, List, Tuple
+
+from autotag import KEYWORD_CATEGORY_MAP
+from models import LedgerManager, Transaction, PersonLedgerEntry
+
+SIZES = (1000, 10000, 100000, 1000000, 10000000)
+
+FIRST_DAY = date(2015, 1, 1).toordinal()
+LAST_DAY = date(2024, 12, 31).toordinal()
+MERCHANTS = ['Downtown', 'Express', 'Online', 'Market', 'Station', 'Central', 'Corner', 'City']
+OTHER_WORDS = ['Payment', 'Transfer', 'Refund', 'Fee', 'Purchase', 'Order', 'Invoice', 'Deposit']
+PEOPLE = [f'{first} {last}' for first in ('Alex', 'Sam', 'Jordan', 'Riley', 'Taylor', 'Casey', 'Morgan', 'Jamie')
+          for last in ('Smith', 'Lee', 'Khan', 'Garcia', 'Novak', 'Sato', 'Okafor', 'Silva')]
+
+
+def iter_transactions(count: int, seed: int = 0) -> Iterator[Transaction]:
+    """
+    About three in four descriptions contain an auto-tag keyword and carry
+    its category; the rest are free text filed as 'Uncategorized'.
+    """
+    rng = random.Random(seed)
+    keywords = sorted(KEYWORD_CATEGORY_MAP)
+    for _ in range(count):
+        day = date.fromordinal(rng.randint(FIRST_DAY, LAST_DAY)).isoformat()
+        reference = rng.randint(1, 10 ** 6)
+        if rng.random() < 0.75:
+            keyword = rng.choice(keywords)
+            description = f'{keyword.title()} {rng.choice(MERCHANTS)} #{reference}'
+            category = KEYWORD_CATEGORY_MAP[keyword]
+        else:
+            description = f'{rng.choice(OTHER_WORDS)} {rng.choice(MERCHANTS)} #{reference}'
+            category = 'Uncategorized'
+        trans_type = 'income' if category in ('Salary', 'Freelance') or rng.random() < 0.1 else 'expense'
+        yield Transaction(round(rng.lognormvariate(3.5, 1.0), 2), day, description, category, trans_type)
+
+
+def iter_ledger_entries(count: int, seed: int = 0) -> Iterator[PersonLedgerEntry]:
+    rng = random.Random(seed + 1)
+    for _ in range(count):
+        day = date.fromordinal(rng.randint(FIRST_DAY, LAST_DAY)).isoformat()
+        yield PersonLedgerEntry(rng.choice(PEOPLE), round(rng.uniform(5, 500), 2),
+                                rng.choice(('Lunch', 'Loan', 'Tickets', 'Rent share', 'Gift')), day,
+                                rng.choice(('to_give', 'to_receive')))
+
+
+def generate(count: int, seed: int = 0) -> Tuple[List[Transaction], List[PersonLedgerEntry]]:
+    """`count` transactions plus one ledger entry per ten transactions."""
+    return list(iter_transactions(count, seed)), list(iter_ledger_entries(count // 10, seed))
+
+
+def build_manager(count: int, seed: int = 0) -> LedgerManager:
+    manager = LedgerManager()
+    transactions, entries = generate(count, seed)
+    manager.bulk_add(transactions, entries)
+    return manager
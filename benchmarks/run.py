@@ -0,0 +1,193 @@
+"""
+Benchmark suite: load/save, filtering, auto-tagging, monthly aggregation,
+chart updates and CSV export on synthetic ledgers.
+
+Runs headless. Results are written as JSON so two revisions can be compared:
+
+    python -m benchmarks.run --sizes 1000,100000 --output before.json
+    python -m benchmarks.run --sizes 1000,100000 --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import autotag
+from benchmarks.generate import SIZES, generate
+from models import JSON_BACKEND, LedgerManager, TransactionFilter, np
+from utils import export_transactions_to_csv, export_ledger_to_csv
+
+# The shapes of filter the Transactions tab produces.
+FILTERS = {
+    'category': TransactionFilter(category='Food'),
+    'one_year': TransactionFilter(date_from='2020-01-01', date_to='2020-12-31'),
+    'amount_range': TransactionFilter(min_amount=50, max_amount=100),
+    'description': TransactionFilter(description='pizza'),
+    'combined': TransactionFilter(category='Transport', date_from='2018-03-15', date_to='2022-06-30',
+                                  min_amount=10, description='uber'),
+}
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def monthly_scan(transactions) -> Dict:
+    totals = defaultdict(lambda: defaultdict(float))
+    for t in transactions:
+        totals[t.date[:7]][t.trans_type] += t.amount
+    return totals
+
+
+def chart_benchmarks(manager: LedgerManager, repeat: int) -> Dict[str, float]:
+    try:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from charts import BarChart
+    except ImportError as e:
+        print(f'skipping chart benchmarks: {e}', file=sys.stderr)
+        return {}
+    totals = manager.monthly_totals(TransactionFilter())
+    months = sorted(totals)
+    values = [[totals[m].get('income', 0.0) for m in months], [totals[m].get('expense', 0.0) for m in months]]
+    chart = BarChart(FigureCanvasAgg(Figure(figsize=(4, 2))), [('Income', 'green', -0.18), ('Expense', 'red', 0.18)],
+                     0.32, others_label='Earlier', keep='last')
+
+    def rebuild():
+        chart.labels = None
+        chart.update(months, values)
+        chart.canvas.draw()
+
+    def update():
+        chart.update(months, values)
+        chart.canvas.draw()
+
+    return {'chart.rebuild': best_of(rebuild, repeat), 'chart.update': best_of(update, repeat)}
+
+
+def run_size(size: int, repeat: int, seed: int) -> Dict[str, float]:
+    results = {}
+    start = time.perf_counter()
+    transactions, entries = generate(size, seed)
+    results['generate'] = time.perf_counter() - start
+
+    manager = LedgerManager()
+    start = time.perf_counter()
+    manager.bulk_add(transactions, entries)
+    results['bulk_add'] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, 'data.json')
+        results['save_to_json'] = best_of(lambda: manager.save_to_json(data_path), repeat)
+        results['load_from_json'] = best_of(lambda: LedgerManager().load_from_json(data_path), repeat)
+        csv_path = os.path.join(tmp, 'export.csv')
+        results['export_transactions_to_csv'] = best_of(lambda: export_transactions_to_csv(transactions, csv_path), repeat)
+        results['export_ledger_to_csv'] = best_of(lambda: export_ledger_to_csv(entries, csv_path), repeat)
+
+    for name, criteria in FILTERS.items():
+        results[f'filter.predicate.{name}'] = best_of(lambda: [t for t in transactions if criteria.matches(t)], repeat)
+        results[f'filter.indexed.{name}'] = best_of(lambda: manager.filter_transactions(criteria), repeat)
+    results['search'] = best_of(lambda: manager.search('pizz* downtown'), repeat)
+
+    descriptions = [t.description for t in transactions]
+
+    def tag_cold():
+        autotag.clear_cache()
+        for d in descriptions:
+            autotag.auto_tag_category(d)
+
+    results['auto_tag_category.cold'] = best_of(tag_cold, repeat)
+    results['auto_tag_category.warm'] = best_of(lambda: [autotag.auto_tag_category(d) for d in descriptions], repeat)
+
+    results['monthly.aggregates'] = best_of(lambda: manager.monthly_totals(TransactionFilter()), repeat)
+    results['monthly.aggregates.filtered'] = best_of(lambda: manager.monthly_totals(FILTERS['one_year']), repeat)
+    results['monthly.scan'] = best_of(lambda: monthly_scan(transactions), repeat)
+
+    results.update(chart_benchmarks(manager, repeat))
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+# Timings this short are mostly noise and are not compared.
+MIN_COMPARED_SECONDS = 0.001
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """Benchmarks at least `threshold` times slower than in `baseline`."""
+    regressions = []
+    for size, timings in results.items():
+        for name, seconds in timings.items():
+            before = baseline.get(size, {}).get(name)
+            if before and before >= MIN_COMPARED_SECONDS and seconds / before >= threshold:
+                regressions.append(f'{name} @ {size}: {before * 1000:.2f} ms -> {seconds * 1000:.2f} ms '
+                                   f'({seconds / before:.2f}x)')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the benchmark suite on synthetic ledgers.')
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help=f'comma-separated transaction counts (up to {SIZES[-1]})')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark; the best is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown ratio reported as a regression (default 1.25)')
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'json_backend': JSON_BACKEND,
+            'numpy': np is not None,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': {},
+    }
+    for size in (int(s) for s in args.sizes.split(',')):
+        timings = run_size(size, args.repeat, args.seed)
+        report['results'][str(size)] = timings
+        print(f'{size} transactions')
+        for name, seconds in timings.items():
+            print(f'  {name:<36} {seconds * 1000:10.2f} ms')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(report['results'], baseline, args.threshold)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+from typing import Callable, List, Optional, Sequence, Tuple
+from PyQt5.QtCore import QSize, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QVBoxLayout, QWidget
+import instrument
+
+
+def bucket(labels: List[str], values: List[List[float]], limit: int, others_label: str,
+           keep: str = 'largest') -> Tuple[List[str], List[List[float]]]:
+    """
+    Fold all but `limit - 1` groups into one `others_label` group.
+
+    `values` holds one list per series, parallel to `labels`. With
+    keep='largest' the groups with the biggest total magnitude stay, in their
+    original order; with keep='last' the trailing groups stay (e.g. the most
+    recent months) and the others group comes first.
+    """
+    if len(labels) <= limit:
+        return labels, values
+    count = limit - 1
+    if keep == 'last':
+        kept = list(range(len(labels) - count, len(labels)))
+    else:
+        weight = [sum(abs(series[i]) for series in values) for i in range(len(labels))]
+        kept = sorted(sorted(range(len(labels)), key=lambda i: -weight[i])[:count])
+    kept_set = set(kept)
+    folded = [i for i in range(len(labels)) if i not in kept_set]
+    rest = [sum(series[i] for i in folded) for series in values]
+    kept_labels = [labels[i] for i in kept]
+    kept_values = [[series[i] for i in kept] for series in values]
+    if keep == 'last':
+        return [others_label] + kept_labels, [[r] + s for r, s in zip(rest, kept_values)]
+    return kept_labels + [others_label], [s + [r] for r, s in zip(rest, kept_values)]
+
+
+class BarChart:
+    """
+    A grouped bar chart that keeps its axes and bars between updates.
+
+    update() only sets bar heights and rescales when the groups are the same
+    as last time. The axes are rebuilt only when the group labels change.
+    Redraws go through draw_idle(), so several updates within one event loop
+    pass paint once. More than `max_groups` groups are bucketed (see bucket()).
+    """
+
+    def __init__(self, canvas, series: Sequence[Tuple[str, str, float]], width: float,
+                 title: Optional[str] = None, empty_text: str = 'No data',
+                 max_groups: int = 24, others_label: str = 'Others', keep: str = 'largest'):
+        self.canvas = canvas
+        self.series = series  # (legend label, color, x offset) per series
+        self.width = width
+        self.title = title
+        self.empty_text = empty_text
+        self.max_groups = max_groups
+        self.others_label = others_label
+        self.keep = keep
+        self.ax = canvas.figure.add_subplot(111)
+        self.labels: Optional[List[str]] = None
+        self.bars = []
+        self.rebuilds = 0
+
+    def update(self, labels: List[str], values: List[List[float]]):
+        labels, values = bucket(labels, values, self.max_groups, self.others_label, self.keep)
+        if labels != self.labels:
+            self._rebuild(labels, values)
+        else:
+            for bars, heights in zip(self.bars, values):
+                for rect, height in zip(bars, heights):
+                    rect.set_height(height)
+            self.ax.relim()
+            self.ax.autoscale_view()
+        self.canvas.draw_idle()
+
+    def _rebuild(self, labels: List[str], values: List[List[float]]):
+        self.rebuilds += 1
+        self.labels = labels
+        ax = self.ax
+        ax.clear()
+        if not labels:
+            self.bars = []
+            ax.text(0.5, 0.5, self.empty_text, ha='center', va='center')
+            return
+        x = range(len(labels))
+        self.bars = [
+            ax.bar([i + offset for i in x], heights, self.width, label=label, color=color)
+            for (label, color, offset), heights in zip(self.series, values)
+        ]
+        ax.set_xticks(x)
+        ax.set_xticklabels(labels, rotation=45, ha='right')
+        ax.set_ylabel('Amount')
+        ax.legend()
+        if self.title:
+            ax.set_title(self.title)
+
+
+class ChartPanel(QWidget):
+    """
+    Placeholder for a chart whose matplotlib canvas is created the first time
+    the panel is shown, after the window has painted. matplotlib itself is
+    imported at that point, so it costs nothing at startup and nothing at all
+    for charts that are never looked at. set_data() before then only keeps
+    the latest data for the chart to start from. hold() postpones the chart
+    until release(): the import takes the GIL for about 0.7 s, so it should
+    not compete with a load running on another thread.
+    """
+    created = pyqtSignal()
+
+    def __init__(self, figsize: Tuple[float, float], make_chart: Callable[..., BarChart], parent=None):
+        super().__init__(parent)
+        self.figsize = figsize
+        self.make_chart = make_chart  # called with the new canvas
+        self.canvas = None
+        self.chart: Optional[BarChart] = None
+        self._data = ([], [])
+        self._held = False
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+    def sizeHint(self) -> QSize:
+        if self.canvas is not None:
+            return self.canvas.sizeHint()
+        # A matplotlib canvas asks for figsize at 100 dpi.
+        return QSize(int(self.figsize[0] * 100), int(self.figsize[1] * 100))
+
+    def set_data(self, labels: List[str], values: List[List[float]]):
+        if self.chart is None:
+            self._data = (labels, values)
+        else:
+            self.chart.update(labels, values)
+
+    def hold(self):
+        self._held = True
+
+    def release(self):
+        self._held = False
+        if self.chart is None and self.isVisible():
+            QTimer.singleShot(0, self._create_chart)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.chart is None and not self._held:
+            QTimer.singleShot(0, self._create_chart)
+
+    def _create_chart(self):
+        if self.chart is not None or self._held:
+            return
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+        self.canvas = FigureCanvas(Figure(figsize=self.figsize))
+        if instrument.ENABLED:
+            # Updates only call draw_idle(); the render itself happens in draw().
+            self.canvas.draw = instrument.timed('BarChart.draw')(self.canvas.draw)
+        self.layout().addWidget(self.canvas)
+        self.chart = self.make_chart(self.canvas)
+        self.chart.update(*self._data)
+        self._data = None
+        self.created.emit()
@@ -0,0 +1,165 @@
+"""
+Command-line reports and imports over a data file, without Qt:
+
+    python cli.py filter --category Food --from 2024-01-01 --limit 20
+    python cli.py monthly --from 2024-01-01 --to 2024-12-31
+    python cli.py balances --json
+    python cli.py import bank.csv --kind transactions
+    python cli.py ingest statements/*.csv --workers 8
+    python cli.py export food.csv.gz --category Food
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import date
+
+import ingest
+import query
+from models import LedgerManager, TransactionFilter
+from utils import export_transactions_to_csv, export_ledger_to_csv
+
+
+def iso_date(value: str) -> str:
+    """argparse type for --from/--to: a valid date, normalised to YYYY-MM-DD."""
+    return date.fromisoformat(value).isoformat()
+
+
+def criteria_from_args(args) -> TransactionFilter:
+    return TransactionFilter(category=args.category, date_from=args.date_from, date_to=args.date_to,
+                             min_amount=args.min_amount, max_amount=args.max_amount,
+                             description=args.description)
+
+
+def run_filter(source: query.Source, args):
+    if args.search:
+        rows = query.load_source(source).search(args.search, args.limit)
+    else:
+        rows = query.filter_transactions(source, criteria_from_args(args))
+        if args.limit is not None:
+            rows = rows[:args.limit]
+    if args.json:
+        json.dump([t.to_dict() for t in rows], sys.stdout)
+        print()
+        return
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['Amount', 'Date', 'Description', 'Category', 'Type'])
+    for t in rows:
+        writer.writerow([t.amount, t.date, t.description, t.category, t.trans_type])
+
+
+def run_monthly(source: query.Source, args):
+    summary = query.monthly_summary(source, criteria_from_args(args))
+    if args.json:
+        json.dump(summary, sys.stdout)
+        print()
+        return
+    print(f'{"Month":<8} {"Income":>14} {"Expense":>14} {"Net":>14}')
+    for month, totals in summary.items():
+        income, expense = totals['income'], totals['expense']
+        print(f'{month:<8} {income:14.2f} {expense:14.2f} {income - expense:14.2f}')
+
+
+def run_balances(source: query.Source, args):
+    balances = query.ledger_balances(source)
+    if args.json:
+        json.dump(balances, sys.stdout)
+        print()
+        return
+    print(f'{"Name":<24} {"To Give":>12} {"To Receive":>12} {"Net":>12}')
+    for name, cell in balances['people'].items():
+        give, receive = cell.get('to_give', 0.0), cell.get('to_receive', 0.0)
+        print(f'{name:<24} {give:12.2f} {receive:12.2f} {receive - give:12.2f}')
+    print(f'{"Total":<24} {balances["to_give"]:12.2f} {balances["to_receive"]:12.2f} {balances["net"]:12.2f}')
+
+
+def run_import(manager: LedgerManager, args):
+    result = query.import_rows(manager, args.csv, args.kind, args.batch_size)
+    print(f'{result["imported"]} rows imported, {len(result["errors"])} rejected')
+    for error in result['errors']:
+        print(error, file=sys.stderr)
+
+
+def run_ingest(manager: LedgerManager, args):
+    result = ingest.ingest_files(manager, args.csv, args.kind, args.workers, not args.keep_duplicates)
+    print(f'{result["imported"]} rows imported, {result["duplicates"]} duplicates skipped, '
+          f'{len(result["errors"])} rejected')
+    for error in result['errors']:
+        print(error, file=sys.stderr)
+
+
+def run_export(source: query.Source, args):
+    progress = (lambda count: print(f'{count} rows', end='\r', file=sys.stderr)) if args.progress else None
+    try:
+        if args.ledger:
+            count = export_ledger_to_csv(query.load_source(source).ledger_entries, args.output, progress=progress)
+        else:
+            rows = query.filter_transactions(source, criteria_from_args(args))
+            count = export_transactions_to_csv(rows, args.output, progress=progress)
+    finally:
+        if progress is not None:
+            print(file=sys.stderr)  # end the '\r'-rewritten progress line, also before an error
+    print(f'{count} rows exported to {args.output}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Budget Management System reports and imports, without the GUI.')
+    parser.add_argument('--data', default='data.json',
+                        help='data file; .db/.sqlite files use the SQLite backend')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    filtering = argparse.ArgumentParser(add_help=False)
+    filtering.add_argument('--category')
+    filtering.add_argument('--from', dest='date_from', metavar='YYYY-MM-DD', type=iso_date)
+    filtering.add_argument('--to', dest='date_to', metavar='YYYY-MM-DD', type=iso_date)
+    filtering.add_argument('--min', dest='min_amount', type=float)
+    filtering.add_argument('--max', dest='max_amount', type=float)
+    filtering.add_argument('--description', help='substring of the description')
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument('--json', action='store_true', help='print JSON instead of a table')
+
+    command = commands.add_parser('filter', parents=[filtering, output], help='list matching transactions as CSV')
+    command.add_argument('--search', help="indexed description search, e.g. 'pizz* hut'; ignores the other filters")
+    command.add_argument('--limit', type=int)
+    command.set_defaults(run=run_filter, read_only=True)
+    command = commands.add_parser('monthly', parents=[filtering, output], help='income and expense per month')
+    command.set_defaults(run=run_monthly, read_only=True)
+    command = commands.add_parser('balances', parents=[output], help='ledger totals per person')
+    command.set_defaults(run=run_balances, read_only=True)
+    command = commands.add_parser('import', help='import a CSV export')
+    command.add_argument('csv')
+    command.add_argument('--kind', choices=sorted(query.IMPORTERS), default='transactions')
+    command.add_argument('--batch-size', type=int, default=5000)
+    command.set_defaults(run=run_import)
+    command = commands.add_parser('ingest', help='import many CSV exports in parallel, skipping overlapping rows')
+    command.add_argument('csv', nargs='+')
+    command.add_argument('--kind', choices=sorted(query.IMPORTERS), default='transactions')
+    command.add_argument('--workers', type=int, help='worker processes (default: one per core)')
+    command.add_argument('--keep-duplicates', action='store_true',
+                         help='add rows that already appear in another file or the ledger')
+    command.set_defaults(run=run_ingest)
+    command = commands.add_parser('export', parents=[filtering],
+                                  help='export matching transactions (or the ledger) to CSV; .gz paths are compressed')
+    command.add_argument('output')
+    command.add_argument('--ledger', action='store_true', help='export the ledger instead; filters are ignored')
+    command.add_argument('--progress', action='store_true', help='show the number of rows written')
+    command.set_defaults(run=run_export, read_only=True)
+    args = parser.parse_args(argv)
+
+    # Reports never write the data file, so they can run while the GUI has it open.
+    if getattr(args, 'read_only', False):
+        try:
+            source = query.open_source(args.data)
+        except FileNotFoundError as e:
+            parser.error(str(e))
+    else:
+        source = LedgerManager()
+        source.open_storage(args.data)
+    try:
+        args.run(source, args)
+    finally:
+        source.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Opt-in timing of hot paths.
+
+Run with BUDGET_INSTRUMENT=1 to record call counts and latency histograms
+for functions decorated with @timed and blocks wrapped in span(). The app
+then shows the busiest operations in its status bar, and at exit the report
+is printed to stderr, or written as JSON to BUDGET_INSTRUMENT_FILE if set.
+
+When the variable is unset, @timed returns the function itself and span()
+a shared no-op context manager, so instrumented code runs as if it were not.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Optional
+
+ENABLED = os.environ.get('BUDGET_INSTRUMENT', '') not in ('', '0')
+DUMP_PATH = os.environ.get('BUDGET_INSTRUMENT_FILE')
+
+# Histogram bucket i counts calls that took under 2**i microseconds (and at
+# least half that); the last bucket also takes anything slower.
+BUCKETS = 32
+
+
+class Histogram:
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * BUCKETS
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.buckets[min(int(seconds * 1e6).bit_length(), BUCKETS - 1)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound in seconds of the bucket holding the `fraction` quantile."""
+        rank = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(2 ** i / 1e6, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'buckets_us': {str(2 ** i): n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+_stats: Dict[str, Histogram] = {}
+_lock = threading.Lock()  # saves and loads are timed on background threads
+
+
+def record(name: str, seconds: float):
+    with _lock:
+        histogram = _stats.get(name)
+        if histogram is None:
+            histogram = _stats[name] = Histogram()
+        histogram.add(seconds)
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorator recording each call's latency under `name` (default: the qualified name)."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(label, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def _span(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+_NULL_SPAN = nullcontext()
+
+
+def span(name: str):
+    """Context manager recording the latency of its block under `name`."""
+    return _span(name) if ENABLED else _NULL_SPAN
+
+
+def snapshot() -> Dict[str, Dict]:
+    with _lock:
+        return {name: histogram.to_dict() for name, histogram in _stats.items()}
+
+
+def summary(limit: int = 3) -> str:
+    """One line naming the `limit` operations with the most total time."""
+    stats = sorted(snapshot().items(), key=lambda item: -item[1]['total'])[:limit]
+    return ' | '.join(f'{name} {s["count"]}x p50 {s["p50"] * 1000:.1f} ms p95 {s["p95"] * 1000:.1f} ms'
+                      for name, s in stats)
+
+
+def report() -> str:
+    lines = [f'{"operation":<40}{"calls":>8}{"total ms":>12}{"mean ms":>10}{"p50 ms":>10}'
+             f'{"p95 ms":>10}{"p99 ms":>10}{"max ms":>10}']
+    for name, s in sorted(snapshot().items(), key=lambda item: -item[1]['total']):
+        lines.append(f'{name:<40}{s["count"]:>8}{s["total"] * 1000:>12.1f}{s["mean"] * 1000:>10.2f}'
+                     f'{s["p50"] * 1000:>10.2f}{s["p95"] * 1000:>10.2f}{s["p99"] * 1000:>10.2f}'
+                     f'{s["max"] * 1000:>10.2f}')
+    return '\n'.join(lines)
+
+
+def dump(path: Optional[str] = None):
+    """Write the snapshot as JSON to `path` (default BUDGET_INSTRUMENT_FILE), else print report() to stderr."""
+    path = path or DUMP_PATH
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot(), f, indent=2)
+    else:
+        print(report(), file=sys.stderr)
+
+
+if ENABLED:
+    atexit.register(dump)
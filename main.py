@@ -1,28 +1,254 @@
+import time
+STARTED = time.perf_counter()  # before the heavy imports, for --profile-startup
 import sys
+import argparse
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QTabWidget, QVBoxLayout, QLabel,
-    QTableWidget, QTableWidgetItem, QHBoxLayout, QPushButton, QLineEdit, QComboBox, QDateEdit, QMessageBox, QFileDialog,
-    QSplitter, QGroupBox, QSizePolicy
+    QTableView, QHBoxLayout, QPushButton, QLineEdit, QComboBox, QDateEdit, QMessageBox, QFileDialog,
+    QSplitter, QGroupBox, QSizePolicy, QProgressDialog
 )
-from PyQt5.QtCore import QDate
-from models import LedgerManager, Transaction
+from PyQt5.QtCore import QDate, Qt, QAbstractTableModel, QModelIndex, QObject, QThread, QTimer, pyqtSignal
+from models import LedgerManager, Transaction, TransactionFilter
 from autotag import auto_tag_category
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-from collections import defaultdict
+from charts import BarChart, ChartPanel
+import instrument
+import query
 from utils import export_transactions_to_csv, export_ledger_to_csv
-import csv
+import bisect
+from collections import deque
+import html
+
+# Milliseconds of quiet after a filter edit before the table is refiltered.
+FILTER_DELAY_MS = 150
+# Exports to a .gz path are gzip-compressed.
+EXPORT_FILTERS = 'CSV Files (*.csv);;Compressed CSV Files (*.csv.gz)'
+
+class RecordTableModel(QAbstractTableModel):
+    """
+    Table model over a list of Transaction or PersonLedgerEntry objects.
+
+    The view only asks for the cells it paints, so no per-cell objects are
+    created up front. Edits emit dataChanged for a single row and inserts
+    and removals are announced row by row instead of resetting the model.
+    """
+
+    def __init__(self, headers, fields):
+        super().__init__()
+        self.headers = headers
+        self.fields = fields
+        self.records = []
+        self._rows = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.fields)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.records[index.row()]
+        if role == Qt.DisplayRole:
+            return str(getattr(record, self.fields[index.column()]))
+        if role == Qt.UserRole:
+            return record.id
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    @instrument.timed()
+    def set_records(self, records):
+        self.beginResetModel()
+        self.records = records
+        self._rows = {}
+        self.endResetModel()
+
+    def record(self, row):
+        return self.records[row]
+
+    def row_of(self, record):
+        # Row numbers shift on removal, so the id -> row map is rebuilt lazily.
+        if len(self._rows) != len(self.records):
+            self._rows = {r.id: row for row, r in enumerate(self.records)}
+        return self._rows.get(record.id)
+
+    def append(self, record):
+        row = len(self.records)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.records.append(record)
+        if len(self._rows) == row:
+            self._rows[record.id] = row
+        self.endInsertRows()
+
+    def remove(self, record):
+        row = self.row_of(record)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.records[row]
+        self._rows = {}
+        self.endRemoveRows()
+
+    def extend(self, records):
+        if not records:
+            return
+        first = len(self.records)
+        self.beginInsertRows(QModelIndex(), first, first + len(records) - 1)
+        self.records.extend(records)
+        if len(self._rows) == first:
+            for row, record in enumerate(records, first):
+                self._rows[record.id] = row
+        self.endInsertRows()
+
+    def refresh(self, record):
+        row = self.row_of(record)
+        if row is not None:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.fields) - 1))
+
+class CsvImportWorker(QObject):
+    """Parses a CSV file off the GUI thread and hands records back in batches (see query.parse_batches)."""
+    batch_ready = pyqtSignal(list)
+    progress = pyqtSignal(int)
+    done = pyqtSignal(int, list, bool)  # rows imported, rejected-row messages, cancelled
+
+    def __init__(self, path, kind, batch_size=5000):
+        super().__init__()
+        self.path = path
+        self.kind = kind
+        self.batch_size = batch_size
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        imported = 0
+        errors = []
+        try:
+            for batch in query.parse_batches(self.path, self.kind, errors, self.progress.emit,
+                                             self.batch_size, lambda: self.cancelled):
+                self.batch_ready.emit(batch)
+                imported += len(batch)
+        except Exception as e:
+            errors.append(str(e))
+        self.done.emit(imported, errors, self.cancelled)
+
+# Rows added per event-loop pass during a CSV import, so the window keeps
+# painting and taking input while a large file goes in.
+IMPORT_SLICE_ROWS = 1000
+
+def start_csv_import(parent, manager, path, kind, title):
+    """
+    Import a `kind` CSV export ('transactions' or 'ledger') on a worker
+    thread with a cancellable progress dialog. Parsed rows are queued and
+    added on the GUI thread IMPORT_SLICE_ROWS at a time from a zero-interval
+    timer; storage is synced once when the import ends.
+    """
+    dialog = QProgressDialog(f'Importing {path}...', 'Cancel', 0, 100, parent)
+    dialog.setWindowTitle(title)
+    dialog.setWindowModality(Qt.WindowModal)
+    # Parsing reaches 100% well before the rows are in; finish() closes it.
+    dialog.setAutoClose(False)
+    dialog.setAutoReset(False)
+    thread = QThread(parent)
+    worker = CsvImportWorker(path, kind)
+    worker.moveToThread(thread)
+    manager.defer_sync()
+    pending = deque()
+    added = [0]
+    parsed = [0, 0]  # percent of the file parsed, rows queued so far
+    outcome = []  # the worker's (errors, cancelled) once it is done
+    drain = QTimer(parent)
+    drain.setInterval(0)
+
+    def show_progress():
+        # The share of the parsed part of the file whose rows have been added.
+        percent, queued = parsed
+        dialog.setValue(percent * added[0] // queued if queued else percent)
+
+    def parsed_to(percent):
+        parsed[0] = percent
+        show_progress()
+
+    def queue(batch):
+        if worker.cancelled:
+            return  # parsed before the cancel reached the worker
+        pending.extend(batch)
+        parsed[1] += len(batch)
+        drain.start()
+
+    def add_slice():
+        rows = [pending.popleft() for _ in range(min(IMPORT_SLICE_ROWS, len(pending)))]
+        if rows:
+            query.add_batch(manager, kind, rows)
+            added[0] += len(rows)
+            show_progress()
+        if not pending:
+            drain.stop()
+            if outcome:
+                finish()
+
+    def done(imported, errors, cancelled):
+        outcome.extend((errors, cancelled))
+        if not pending:
+            finish()
+
+    def cancel():
+        worker.cancel()
+        pending.clear()
+
+    def finish():
+        errors, cancelled = outcome
+        drain.deleteLater()
+        manager.flush()
+        dialog.close()
+        thread.quit()
+        text = f'{added[0]} rows imported.'
+        if cancelled:
+            text = 'Import cancelled. ' + text
+        box = QMessageBox(QMessageBox.Warning if errors else QMessageBox.Information, title, text, parent=parent)
+        if errors:
+            box.setInformativeText(f'{len(errors)} rows were rejected.')
+            box.setDetailedText('\n'.join(errors))
+        box.exec_()
+        parent._csv_import = None
+
+    thread.started.connect(worker.run)
+    worker.batch_ready.connect(queue)
+    drain.timeout.connect(add_slice)
+    worker.progress.connect(parsed_to)
+    worker.done.connect(done)
+    thread.finished.connect(worker.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    # A plain function runs in the GUI thread; a bound worker slot would be queued behind run().
+    dialog.canceled.connect(cancel)
+    parent._csv_import = (thread, worker, dialog)
+    dialog.show()
+    thread.start()
 
 class TransactionsTab(QWidget):
-    def __init__(self):
+    def __init__(self, service: 'LedgerService'):
         super().__init__()
-        self.manager = LedgerManager()
-        self.manager.load_from_json('data.json')
-        self.editing_row = None
-        self.filtered_transactions = self.manager.transactions.copy()
+        self.manager = service.manager
+        self.editing_id = None
+        self.active_filter = TransactionFilter()
+        # Filter edits are applied once typing pauses; the chart is redrawn
+        # after the table so new rows show up first.
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DELAY_MS)
+        self.filter_timer.timeout.connect(self.apply_filters)
+        self.chart_timer = QTimer(self)
+        self.chart_timer.setSingleShot(True)
+        self.chart_timer.timeout.connect(self.update_bar_chart)
         self.init_ui()
         self.load_transactions()
         self.update_bar_chart()
+        service.transactions_changed.connect(self.on_data_changed)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -39,7 +265,7 @@ class TransactionsTab(QWidget):
         filter_layout = QHBoxLayout()
         self.category_filter = QComboBox()
         self.category_filter.addItem('All')
-        self.category_filter.addItems(sorted({t.category for t in self.manager.transactions}))
+        self.category_filter.addItems(self.manager.categories())
         self.date_from_filter = QDateEdit()
         self.date_from_filter.setCalendarPopup(True)
         self.date_from_filter.setDisplayFormat('yyyy-MM-dd')
@@ -54,7 +280,13 @@ class TransactionsTab(QWidget):
         self.desc_search = QLineEdit()
         self.desc_search.setPlaceholderText('Search Description')
         self.filter_btn = QPushButton('Filter')
-        self.filter_btn.clicked.connect(self.apply_filters)
+        # clicked(bool) would pass `checked` on to an instrumented apply_filters.
+        self.filter_btn.clicked.connect(lambda: self.apply_filters())
+        self.category_filter.currentIndexChanged.connect(self.filter_timer.start)
+        self.date_from_filter.dateChanged.connect(self.filter_timer.start)
+        self.date_to_filter.dateChanged.connect(self.filter_timer.start)
+        for line_edit in (self.amount_min_filter, self.amount_max_filter, self.desc_search):
+            line_edit.textChanged.connect(self.filter_timer.start)
         filter_layout.addWidget(QLabel('Category:'))
         filter_layout.addWidget(self.category_filter)
         filter_layout.addWidget(QLabel('Date From:'))
@@ -67,9 +299,13 @@ class TransactionsTab(QWidget):
         filter_layout.addWidget(self.filter_btn)
         layout.addLayout(filter_layout)
         # Table
-        self.table = QTableWidget(0, 5)
-        self.table.setHorizontalHeaderLabels(['Amount', 'Date', 'Description', 'Category', 'Type'])
-        self.table.cellClicked.connect(self.on_row_selected)
+        self.model = RecordTableModel(
+            ['Amount', 'Date', 'Description', 'Category', 'Type'],
+            ['amount', 'date', 'description', 'category', 'trans_type']
+        )
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.clicked.connect(self.on_row_selected)
         layout.addWidget(self.table)
         # Form
         form_layout = QHBoxLayout()
@@ -105,66 +341,102 @@ class TransactionsTab(QWidget):
         form_layout.addWidget(self.delete_btn)
         layout.addLayout(form_layout)
         # Bar chart (improved)
-        self.bar_canvas = FigureCanvas(Figure(figsize=(4, 2)))
-        self.bar_canvas.setMaximumWidth(500)
+        width, gap = 0.32, 0.04
+        self.bar_panel = ChartPanel((4, 2), lambda canvas: BarChart(
+            canvas,
+            [('Income', 'green', -(width/2 + gap/2)), ('Expense', 'red', width/2 + gap/2)],
+            width, title='Monthly Income vs Expenses', others_label='Earlier', keep='last'
+        ))
+        self.bar_panel.setMaximumWidth(500)
         layout.addWidget(QLabel('Monthly Income vs Expenses (Bar Chart)'))
-        layout.addWidget(self.bar_canvas)
+        layout.addWidget(self.bar_panel)
         self.setLayout(layout)
 
+    @instrument.timed()
     def update_bar_chart(self):
-        self.bar_canvas.figure.clear()
-        ax = self.bar_canvas.figure.add_subplot(111)
-        from collections import defaultdict
-        monthly_income = defaultdict(float)
-        monthly_expense = defaultdict(float)
-        for t in self.filtered_transactions:
-            month = t.date[:7]  # yyyy-mm
-            if t.trans_type == 'income':
-                monthly_income[month] += t.amount
-            elif t.trans_type == 'expense':
-                monthly_expense[month] += t.amount
-        months = sorted(set(list(monthly_income.keys()) + list(monthly_expense.keys())))
-        income_vals = [monthly_income[m] for m in months]
-        expense_vals = [monthly_expense[m] for m in months]
-        if months:
-            import numpy as np
-            x = np.arange(len(months))
-            width = 0.32
-            gap = 0.04
-            ax.bar(x - (width/2 + gap/2), income_vals, width, label='Income', color='green')
-            ax.bar(x + (width/2 + gap/2), expense_vals, width, label='Expense', color='red')
-            ax.set_xticks(x)
-            ax.set_xticklabels(months, rotation=45, ha='right')
-            ax.set_ylabel('Amount')
-            ax.legend()
-            ax.set_title('Monthly Income vs Expenses')
-        else:
-            ax.text(0.5, 0.5, 'No data', ha='center', va='center')
-        self.bar_canvas.draw()
+        summary = query.monthly_summary(self.manager, self.active_filter, rows=self.filtered_transactions)
+        months = list(summary)
+        income_vals = [summary[m]['income'] for m in months]
+        expense_vals = [summary[m]['expense'] for m in months]
+        self.bar_panel.set_data(months, [income_vals, expense_vals])
 
-    def apply_filters(self):
+    def current_filter(self):
         cat = self.category_filter.currentText()
-        date_from = self.date_from_filter.date().toString('yyyy-MM-dd')
-        date_to = self.date_to_filter.date().toString('yyyy-MM-dd')
-        min_amt = self.amount_min_filter.text()
-        max_amt = self.amount_max_filter.text()
-        desc = self.desc_search.text().lower()
-        filtered = []
-        for t in self.manager.transactions:
-            if cat != 'All' and t.category != cat:
-                continue
-            if t.date < date_from or t.date > date_to:
-                continue
-            if min_amt and t.amount < float(min_amt):
-                continue
-            if max_amt and t.amount > float(max_amt):
-                continue
-            if desc and desc not in t.description.lower():
-                continue
-            filtered.append(t)
-        self.filtered_transactions = filtered
-        self.load_transactions()
-        self.update_bar_chart()
+        return TransactionFilter(
+            category=None if cat == 'All' else cat,
+            date_from=self.date_from_filter.date().toString('yyyy-MM-dd'),
+            date_to=self.date_to_filter.date().toString('yyyy-MM-dd'),
+            min_amount=self._parse_amount(self.amount_min_filter.text()),
+            max_amount=self._parse_amount(self.amount_max_filter.text()),
+            description=self.desc_search.text()
+        )
+
+    @staticmethod
+    def _parse_amount(text):
+        try:
+            return float(text) if text else None
+        except ValueError:
+            return None
+
+    @instrument.timed()
+    def apply_filters(self):
+        self.filter_timer.stop()
+        criteria = self.current_filter()
+        if criteria.narrows(self.active_filter):
+            # Refine the rows on screen rather than rescanning the ledger.
+            self.model.set_records(query.filter_transactions(self.manager, criteria, within=self.model.records))
+            self.active_filter = criteria
+        else:
+            self.active_filter = criteria
+            self.load_transactions()
+        self.chart_timer.start()
+
+    def on_data_changed(self, action, records):
+        if action == 'reset':
+            self.refresh_filters()
+            return
+        self._sync_category_options()
+        if action == 'added':
+            self.model.extend([t for t in records if self.active_filter.matches(t)])
+        else:
+            for t in records:
+                if action == 'deleted' or not self.active_filter.matches(t):
+                    self.model.remove(t)
+                elif self.model.row_of(t) is None:
+                    self.model.append(t)
+                else:
+                    self.model.refresh(t)
+        self.chart_timer.start()
+
+    def _sync_category_options(self):
+        """List exactly the categories in use, adding new ones and dropping emptied ones."""
+        combo = self.category_filter
+        categories = self.manager.categories()
+        listed = [combo.itemText(i) for i in range(1, combo.count())]
+        if listed == categories:
+            return
+        current = combo.currentText()
+        in_use = set(categories)
+        # Rows moving above the selection shift its index; that is not a filter change.
+        combo.blockSignals(True)
+        for i in range(combo.count() - 1, 0, -1):
+            if combo.itemText(i) not in in_use:
+                combo.removeItem(i)
+        listed = [combo.itemText(i) for i in range(1, combo.count())]
+        for category in categories:
+            position = bisect.bisect_left(listed, category)
+            if position == len(listed) or listed[position] != category:
+                listed.insert(position, category)
+                combo.insertItem(1 + position, category)
+        combo.blockSignals(False)
+        if current not in in_use and current != 'All':
+            # The selected category is gone; show everything instead.
+            combo.setCurrentIndex(0)
+            self.filter_timer.start()
+
+    @property
+    def filtered_transactions(self):
+        return self.model.records
 
     def update_category_autotag(self):
         desc = self.desc_input.text()
@@ -180,29 +452,24 @@ class TransactionsTab(QWidget):
             trans_type = self.type_input.currentText()
             t = Transaction(amount, date, desc, category, trans_type)
             self.manager.add_transaction(t)
-            self.manager.save_to_json('data.json')
-            self.manager.load_from_json('data.json')
-            self.filtered_transactions = self.manager.transactions.copy()
-            self.refresh_filters()
             self.clear_form()
-            self.update_bar_chart()
         except Exception as e:
             QMessageBox.warning(self, 'Error', f'Invalid input: {e}')
 
-    def on_row_selected(self, row, column):
-        t = self.filtered_transactions[row]
+    def on_row_selected(self, index):
+        t = self.manager.get_transaction(index.data(Qt.UserRole))
         self.amount_input.setText(str(t.amount))
         self.date_input.setDate(QDate.fromString(t.date, 'yyyy-MM-dd'))
         self.desc_input.setText(t.description)
         self.category_input.setText(t.category)
         self.type_input.setCurrentText(t.trans_type)
-        self.editing_row = row
+        self.editing_id = t.id
         self.add_btn.setVisible(False)
         self.save_btn.setVisible(True)
         self.cancel_btn.setVisible(True)
 
     def save_transaction(self):
-        if self.editing_row is None:
+        if self.editing_id is None:
             return
         try:
             amount = float(self.amount_input.text())
@@ -210,56 +477,35 @@ class TransactionsTab(QWidget):
             desc = self.desc_input.text()
             category = self.category_input.text() or auto_tag_category(desc)
             trans_type = self.type_input.currentText()
-            t = Transaction(amount, date, desc, category, trans_type)
-            idx = self.manager.transactions.index(self.filtered_transactions[self.editing_row])
-            self.manager.transactions[idx] = t
-            self.manager.save_to_json('data.json')
-            self.manager.load_from_json('data.json')
-            self.filtered_transactions = self.manager.transactions.copy()
-            self.refresh_filters()
-            self.clear_form()
-            self.editing_row = None
-            self.add_btn.setVisible(True)
-            self.save_btn.setVisible(False)
-            self.cancel_btn.setVisible(False)
-            self.update_bar_chart()
+            self.manager.update_transaction(
+                self.editing_id,
+                amount=amount,
+                date=date,
+                description=desc,
+                category=category,
+                trans_type=trans_type
+            )
+            self.cancel_edit()
         except Exception as e:
             QMessageBox.warning(self, 'Error', f'Invalid input: {e}')
 
     def cancel_edit(self):
         self.clear_form()
-        self.editing_row = None
+        self.editing_id = None
         self.add_btn.setVisible(True)
         self.save_btn.setVisible(False)
         self.cancel_btn.setVisible(False)
 
     def delete_transaction(self):
-        if self.editing_row is None:
+        if self.editing_id is None:
             QMessageBox.warning(self, 'Error', 'Select a transaction to delete.')
             return
-        idx = self.manager.transactions.index(self.filtered_transactions[self.editing_row])
-        del self.manager.transactions[idx]
-        self.manager.save_to_json('data.json')
-        self.manager.load_from_json('data.json')
-        self.filtered_transactions = self.manager.transactions.copy()
-        self.refresh_filters()
-        self.clear_form()
-        self.editing_row = None
-        self.add_btn.setVisible(True)
-        self.save_btn.setVisible(False)
-        self.cancel_btn.setVisible(False)
-        self.update_bar_chart()
+        self.manager.delete_transaction(self.editing_id)
+        self.cancel_edit()
 
+    @instrument.timed()
     def load_transactions(self):
-        self.table.setRowCount(0)
-        for t in self.filtered_transactions:
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-            self.table.setItem(row, 0, QTableWidgetItem(str(t.amount)))
-            self.table.setItem(row, 1, QTableWidgetItem(t.date))
-            self.table.setItem(row, 2, QTableWidgetItem(t.description))
-            self.table.setItem(row, 3, QTableWidgetItem(t.category))
-            self.table.setItem(row, 4, QTableWidgetItem(t.trans_type))
+        self.model.set_records(query.filter_transactions(self.manager, self.active_filter))
 
     def clear_form(self):
         self.amount_input.clear()
@@ -271,16 +517,21 @@ class TransactionsTab(QWidget):
     def refresh_filters(self):
         # Update category filter dropdown
         current = self.category_filter.currentText()
+        self.category_filter.blockSignals(True)
         self.category_filter.clear()
         self.category_filter.addItem('All')
-        self.category_filter.addItems(sorted({t.category for t in self.manager.transactions}))
+        self.category_filter.addItems(self.manager.categories())
         idx = self.category_filter.findText(current)
         if idx != -1:
             self.category_filter.setCurrentIndex(idx)
-        self.apply_filters()
+        self.category_filter.blockSignals(False)
+        # The data changed underneath, so the current rows cannot be refined.
+        self.active_filter = self.current_filter()
+        self.load_transactions()
+        self.chart_timer.start()
 
     def export_csv(self):
-        path, _ = QFileDialog.getSaveFileName(self, 'Export Transactions to CSV', '', 'CSV Files (*.csv)')
+        path, _ = QFileDialog.getSaveFileName(self, 'Export Transactions to CSV', '', EXPORT_FILTERS)
         if path:
             try:
                 export_transactions_to_csv(self.filtered_transactions, path)
@@ -291,38 +542,19 @@ class TransactionsTab(QWidget):
     def import_csv(self):
         path, _ = QFileDialog.getOpenFileName(self, 'Import Transactions from CSV', '', 'CSV Files (*.csv)')
         if path:
-            try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        try:
-                            t = Transaction(
-                                float(row['Amount']),
-                                row['Date'],
-                                row['Description'],
-                                row['Category'],
-                                row['Type']
-                            )
-                            self.manager.add_transaction(t)
-                        except Exception:
-                            continue
-                self.manager.save_to_json('data.json')
-                self.manager.load_from_json('data.json')
-                self.filtered_transactions = self.manager.transactions.copy()
-                self.refresh_filters()
-                QMessageBox.information(self, 'Import', 'Transactions imported successfully!')
-            except Exception as e:
-                QMessageBox.warning(self, 'Import Error', str(e))
+            start_csv_import(self, self.manager, path, 'transactions', 'Import Transactions')
 
 class LedgerTab(QWidget):
-    def __init__(self):
+    def __init__(self, service: 'LedgerService'):
         super().__init__()
-        self.manager = LedgerManager()
-        self.manager.load_from_json('data.json')
-        self.editing_row = None
+        self.manager = service.manager
+        self.editing_id = None
+        self.chart_timer = QTimer(self)
+        self.chart_timer.setSingleShot(True)
+        self.chart_timer.timeout.connect(self.update_ledger_bar_chart)
         self.init_ui()
         self.load_ledger()
-        self.update_ledger_bar_chart()
+        service.ledger_changed.connect(self.on_data_changed)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -336,9 +568,13 @@ class LedgerTab(QWidget):
         btn_layout.addWidget(self.import_btn)
         layout.addLayout(btn_layout)
         # Table
-        self.table = QTableWidget(0, 5)
-        self.table.setHorizontalHeaderLabels(['Name', 'Amount', 'Description', 'Date', 'Type'])
-        self.table.cellClicked.connect(self.on_row_selected)
+        self.model = RecordTableModel(
+            ['Name', 'Amount', 'Description', 'Date', 'Type'],
+            ['name', 'amount', 'description', 'date', 'entry_type']
+        )
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.clicked.connect(self.on_row_selected)
         layout.addWidget(self.table)
         # Form
         form_layout = QHBoxLayout()
@@ -376,35 +612,37 @@ class LedgerTab(QWidget):
         self.subtotals_label = QLabel()
         layout.addWidget(self.subtotals_label)
         # Ledger bar chart
-        self.ledger_bar_canvas = FigureCanvas(Figure(figsize=(5, 2)))
+        # The 'to receive' bars sit beside 'to give', like align='edge'.
+        self.ledger_panel = ChartPanel((5, 2), lambda canvas: BarChart(
+            canvas,
+            [('To Give', 'red', 0.0), ('To Receive', 'green', 0.2)],
+            0.4, empty_text='No ledger data'
+        ))
         layout.addWidget(QLabel('Ledger by Person (Bar Chart)'))
-        layout.addWidget(self.ledger_bar_canvas)
+        layout.addWidget(self.ledger_panel)
         self.setLayout(layout)
 
+    @instrument.timed()
     def update_ledger_bar_chart(self):
-        self.ledger_bar_canvas.figure.clear()
-        ax = self.ledger_bar_canvas.figure.add_subplot(111)
-        to_give = defaultdict(float)
-        to_receive = defaultdict(float)
-        for e in self.manager.ledger_entries:
-            if e.entry_type == 'to_give':
-                to_give[e.name] += e.amount
-            elif e.entry_type == 'to_receive':
-                to_receive[e.name] += e.amount
-        names = sorted(set(list(to_give.keys()) + list(to_receive.keys())))
-        give_vals = [to_give[n] for n in names]
-        receive_vals = [to_receive[n] for n in names]
-        if names:
-            x = range(len(names))
-            ax.bar(x, give_vals, width=0.4, label='To Give', color='red', align='center')
-            ax.bar(x, receive_vals, width=0.4, label='To Receive', color='green', align='edge')
-            ax.set_xticks(x)
-            ax.set_xticklabels(names, rotation=45, ha='right')
-            ax.set_ylabel('Amount')
-            ax.legend()
-        else:
-            ax.text(0.5, 0.5, 'No ledger data', ha='center', va='center')
-        self.ledger_bar_canvas.draw()
+        people = query.ledger_balances(self.manager)['people']
+        names = list(people)
+        give_vals = [people[n].get('to_give', 0.0) for n in names]
+        receive_vals = [people[n].get('to_receive', 0.0) for n in names]
+        self.ledger_panel.set_data(names, [give_vals, receive_vals])
+
+    def on_data_changed(self, action, records):
+        if action == 'reset':
+            self.load_ledger()
+            return
+        if action == 'added':
+            self.model.extend(records)
+        for entry in records:
+            if action == 'deleted':
+                self.model.remove(entry)
+            elif action == 'updated':
+                self.model.refresh(entry)
+        self.update_subtotals()
+        self.chart_timer.start()
 
     def add_entry(self):
         try:
@@ -416,27 +654,24 @@ class LedgerTab(QWidget):
             from models import PersonLedgerEntry
             entry = PersonLedgerEntry(name, amount, desc, date, entry_type)
             self.manager.add_ledger_entry(entry)
-            self.manager.save_to_json('data.json')
-            self.load_ledger()
             self.clear_form()
-            self.update_ledger_bar_chart()
         except Exception as e:
             QMessageBox.warning(self, 'Error', f'Invalid input: {e}')
 
-    def on_row_selected(self, row, column):
-        entry = self.manager.ledger_entries[row]
+    def on_row_selected(self, index):
+        entry = self.manager.get_ledger_entry(index.data(Qt.UserRole))
         self.name_input.setText(entry.name)
         self.amount_input.setText(str(entry.amount))
         self.desc_input.setText(entry.description)
         self.date_input.setDate(QDate.fromString(entry.date, 'yyyy-MM-dd'))
         self.type_input.setCurrentText(entry.entry_type)
-        self.editing_row = row
+        self.editing_id = entry.id
         self.add_btn.setVisible(False)
         self.save_btn.setVisible(True)
         self.cancel_btn.setVisible(True)
 
     def save_entry(self):
-        if self.editing_row is None:
+        if self.editing_id is None:
             return
         try:
             name = self.name_input.text()
@@ -444,57 +679,42 @@ class LedgerTab(QWidget):
             desc = self.desc_input.text()
             date = self.date_input.date().toString('yyyy-MM-dd')
             entry_type = self.type_input.currentText()
-            from models import PersonLedgerEntry
-            entry = PersonLedgerEntry(name, amount, desc, date, entry_type)
-            self.manager.ledger_entries[self.editing_row] = entry
-            self.manager.save_to_json('data.json')
-            self.load_ledger()
-            self.clear_form()
-            self.editing_row = None
-            self.add_btn.setVisible(True)
-            self.save_btn.setVisible(False)
-            self.cancel_btn.setVisible(False)
-            self.update_ledger_bar_chart()
+            self.manager.update_ledger_entry(
+                self.editing_id,
+                name=name,
+                amount=amount,
+                description=desc,
+                date=date,
+                entry_type=entry_type
+            )
+            self.cancel_edit()
         except Exception as e:
             QMessageBox.warning(self, 'Error', f'Invalid input: {e}')
 
     def cancel_edit(self):
         self.clear_form()
-        self.editing_row = None
+        self.editing_id = None
         self.add_btn.setVisible(True)
         self.save_btn.setVisible(False)
         self.cancel_btn.setVisible(False)
 
     def delete_entry(self):
-        if self.editing_row is None:
+        if self.editing_id is None:
             QMessageBox.warning(self, 'Error', 'Select an entry to delete.')
             return
-        del self.manager.ledger_entries[self.editing_row]
-        self.manager.save_to_json('data.json')
-        self.load_ledger()
-        self.clear_form()
-        self.editing_row = None
-        self.add_btn.setVisible(True)
-        self.save_btn.setVisible(False)
-        self.cancel_btn.setVisible(False)
-        self.update_ledger_bar_chart()
+        self.manager.delete_ledger_entry(self.editing_id)
+        self.cancel_edit()
 
+    @instrument.timed()
     def load_ledger(self):
-        self.table.setRowCount(0)
-        for entry in self.manager.ledger_entries:
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-            self.table.setItem(row, 0, QTableWidgetItem(entry.name))
-            self.table.setItem(row, 1, QTableWidgetItem(str(entry.amount)))
-            self.table.setItem(row, 2, QTableWidgetItem(entry.description))
-            self.table.setItem(row, 3, QTableWidgetItem(entry.date))
-            self.table.setItem(row, 4, QTableWidgetItem(entry.entry_type))
-        # Subtotals
-        total_to_give = sum(e.amount for e in self.manager.ledger_entries if e.entry_type == 'to_give')
-        total_to_receive = sum(e.amount for e in self.manager.ledger_entries if e.entry_type == 'to_receive')
-        net = total_to_receive - total_to_give
-        self.subtotals_label.setText(f'Total To Give: {total_to_give} | Total To Receive: {total_to_receive} | Net Balance: {net}')
-        self.update_ledger_bar_chart()
+        self.model.set_records(self.manager.ledger_entries)
+        self.update_subtotals()
+        self.chart_timer.start()
+
+    def update_subtotals(self):
+        totals = query.ledger_balances(self.manager)
+        self.subtotals_label.setText(f"Total To Give: {totals['to_give']} | Total To Receive: {totals['to_receive']} | "
+                                     f"Net Balance: {totals['net']}")
 
     def clear_form(self):
         self.name_input.clear()
@@ -504,7 +724,7 @@ class LedgerTab(QWidget):
         self.type_input.setCurrentIndex(0)
 
     def export_csv(self):
-        path, _ = QFileDialog.getSaveFileName(self, 'Export Ledger to CSV', '', 'CSV Files (*.csv)')
+        path, _ = QFileDialog.getSaveFileName(self, 'Export Ledger to CSV', '', EXPORT_FILTERS)
         if path:
             try:
                 export_ledger_to_csv(self.manager.ledger_entries, path)
@@ -515,42 +735,192 @@ class LedgerTab(QWidget):
     def import_csv(self):
         path, _ = QFileDialog.getOpenFileName(self, 'Import Ledger from CSV', '', 'CSV Files (*.csv)')
         if path:
-            try:
-                from models import PersonLedgerEntry
-                with open(path, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        try:
-                            entry = PersonLedgerEntry(
-                                row['Name'],
-                                float(row['Amount']),
-                                row['Description'],
-                                row['Date'],
-                                row['Type']
-                            )
-                            self.manager.add_ledger_entry(entry)
-                        except Exception:
-                            continue
-                self.manager.save_to_json('data.json')
-                self.manager.load_from_json('data.json')
-                self.load_ledger()
-                QMessageBox.information(self, 'Import', 'Ledger imported successfully!')
-            except Exception as e:
-                QMessageBox.warning(self, 'Import Error', str(e))
+            start_csv_import(self, self.manager, path, 'ledger', 'Import Ledger')
+
+# Seconds of quiet after an edit before it is written, off the GUI thread.
+SAVE_DELAY = 0.5
+
+class StorageLoader(QThread):
+    """Runs LedgerManager.open_storage off the GUI thread."""
+    done = pyqtSignal(str)
+
+    def __init__(self, manager, data_path, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.data_path = data_path
+
+    def run(self):
+        try:
+            self.manager.open_storage(self.data_path, save_delay=SAVE_DELAY)
+        except Exception as e:
+            self.done.emit(str(e))
+        else:
+            self.done.emit('')
+
+class LedgerService(QObject):
+    """
+    The one LedgerManager shared by every view.
+
+    It loads the data file once and re-emits the manager's change
+    notifications as Qt signals, one per record kind. Views connect to the
+    signal they need and are disconnected automatically when destroyed.
+    """
+    transactions_changed = pyqtSignal(str, list)  # action, records
+    ledger_changed = pyqtSignal(str, list)
+    loaded = pyqtSignal(str)  # error message, empty on success
+
+    def __init__(self, data_path, parent=None):
+        super().__init__(parent)
+        self.data_path = data_path
+        self.manager = LedgerManager()
+        self.manager.subscribe(self._forward)
+        self._loader = None
+
+    def load_async(self):
+        """
+        Open the data file on a worker thread. The manager stays muted while
+        the worker fills it, so views do not read half-built indexes; once it
+        is done a 'reset' of each kind is emitted on the GUI thread, followed
+        by `loaded`.
+        """
+        self.manager.mute()
+        self._loader = StorageLoader(self.manager, self.data_path, self)
+        self._loader.done.connect(self._on_loaded)
+        self._loader.start()
+
+    def _on_loaded(self, error):
+        self.manager.unmute()
+        self.loaded.emit(error)
+
+    def _forward(self, kind, action, records):
+        signal = self.transactions_changed if kind == 'transaction' else self.ledger_changed
+        signal.emit(action, records)
+
+    def close(self) -> str:
+        """
+        Write out every change and release the data file. Returns an error
+        message if the final write failed; the storage then stays open, so
+        close() can be tried again.
+        """
+        if self._loader is not None:
+            self._loader.wait()
+        try:
+            self.manager.close()
+        except Exception as e:
+            return str(e)
+        return ''
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, data_path='data.json'):
         super().__init__()
         self.setWindowTitle('Budget Management System')
         self.setGeometry(100, 100, 900, 600)
+        # Storage needs a single writer, so both tabs share this service.
+        self.service = LedgerService(data_path, self)
+        self.manager = self.service.manager
         self.tabs = QTabWidget()
-        self.tabs.addTab(TransactionsTab(), 'Transactions')
-        self.tabs.addTab(LedgerTab(), 'Ledger')
+        self.tabs.addTab(TransactionsTab(self.service), 'Transactions')
+        self.tabs.addTab(LedgerTab(self.service), 'Ledger')
         self.setCentralWidget(self.tabs)
+        # The window shows straight away; editing and the charts wait for the data.
+        self.tabs.setEnabled(False)
+        self.chart_panels = [self.tabs.widget(0).bar_panel, self.tabs.widget(1).ledger_panel]
+        for panel in self.chart_panels:
+            panel.hold()
+        self.statusBar().showMessage(f'Loading {data_path}...')
+        self.service.loaded.connect(self.on_loaded)
+        self.service.load_async()
+        # Saves run in the background, so their failures are polled for.
+        self.save_label = QLabel()
+        self.statusBar().addPermanentWidget(self.save_label)
+        self.save_timer = QTimer(self)
+        self.save_timer.timeout.connect(self.update_save_status)
+        if instrument.ENABLED:
+            self.timing_label = QLabel()
+            self.statusBar().addPermanentWidget(self.timing_label)
+            self.timing_timer = QTimer(self)
+            self.timing_timer.timeout.connect(self.update_timing_overlay)
+            self.timing_timer.start(1000)
+
+    def update_timing_overlay(self):
+        self.timing_label.setText(instrument.summary())
+        self.timing_label.setToolTip(f'<pre>{html.escape(instrument.report())}</pre>')
+
+    def on_loaded(self, error):
+        self.statusBar().clearMessage()
+        for panel in self.chart_panels:
+            panel.release()
+        if error:
+            QMessageBox.critical(self, 'Load Error', f'Could not load {self.service.data_path}: {error}')
+            return
+        self.tabs.setEnabled(True)
+        self.save_timer.start(1000)
+
+    def update_save_status(self):
+        storage = self.manager.storage
+        error = storage.error if storage is not None else None
+        self.save_label.setText(f'Saving failed, will retry: {error}' if error else '')
+
+    def closeEvent(self, event):
+        error = self.service.close()
+        if error:
+            answer = QMessageBox.warning(
+                self, 'Save Error',
+                f'Could not save {self.service.data_path}: {error}\n\nQuit anyway? Unsaved changes will be lost.',
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if answer != QMessageBox.Yes:
+                event.ignore()
+                return
+        self.save_timer.stop()
+        super().closeEvent(event)
+
+class StartupProfile:
+    """
+    Records how long each startup phase took and prints the breakdown to
+    stderr once every phase in `pending` has been marked. Each figure is
+    the time since the previous mark, so the lines add up to the total.
+    """
+
+    def __init__(self, started, pending):
+        self.started = self.last = started
+        self.pending = set(pending)
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+        self.pending.discard(phase)
+        if not self.pending:
+            self.report()
+
+    def report(self):
+        lines = ['Startup profile:']
+        lines += [f'  {phase:<16}{seconds * 1000:8.1f} ms' for phase, seconds in self.phases]
+        lines.append(f'  {"total":<16}{(self.last - self.started) * 1000:8.1f} ms')
+        print('\n'.join(lines), file=sys.stderr)
 
 def main():
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    parser = argparse.ArgumentParser(description='Budget Management System')
+    parser.add_argument('--data', default='data.json',
+                        help='data file; .db/.sqlite files use the SQLite backend')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='print how long each startup phase takes')
+    args, qt_args = parser.parse_known_args()
+    profile = StartupProfile(STARTED, ['data loaded', 'chart ready']) if args.profile_startup else None
+    if profile:
+        profile.mark('imports')
+    app = QApplication(sys.argv[:1] + qt_args)
+    if profile:
+        profile.mark('qt init')
+    window = MainWindow(args.data)
+    # Pending background writes are flushed however the event loop ends.
+    app.aboutToQuit.connect(window.service.close)
+    if profile:
+        profile.mark('window built')
+        window.service.loaded.connect(lambda error: profile.mark('data loaded'))
+        window.tabs.widget(0).bar_panel.created.connect(lambda: profile.mark('chart ready'))
+        QTimer.singleShot(0, lambda: profile.mark('window shown'))
     window.show()
     sys.exit(app.exec_())
 
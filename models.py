@@ -1,14 +1,82 @@
-from typing import List, Dict, Optional
-from datetime import date
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Set, Tuple
+from array import array
+from datetime import date, timedelta
+from collections import defaultdict
+import bisect
+import copy
 import json
+import operator
+import os
+import re
+import sys
+import instrument
+from storage import SaveScheduler, Storage, open_store
+
+try:
+    import numpy as np
+except ImportError:  # columnar filtering is optional; fall back to plain Python
+    np = None
+
+# The fastest JSON library available does the bulk encoding and decoding.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'ujson' if ujson is not None else 'json'
+# Data files larger than this are parsed record by record (see iter_json_object).
+STREAM_THRESHOLD = 64 * 1024 * 1024
+
+# Dates are held as day ordinals. Both directions are memoised per distinct
+# day, which also makes every record on the same day share one int object.
+_DAY_OF_ISO: Dict[str, int] = {}
+_ISO_OF_DAY: Dict[int, str] = {}
+
+def iso_date(day: int) -> str:
+    iso = _ISO_OF_DAY.get(day)
+    if iso is None:
+        iso = _ISO_OF_DAY[day] = date.fromordinal(day).isoformat()
+    return iso
+
+def _parse_date(value: str) -> Tuple[int, Optional[str]]:
+    """
+    Return (ordinal, raw) for a date string. `raw` is None when iso_date(ordinal)
+    reproduces the string; otherwise the string is kept verbatim.
+    """
+    day = _DAY_OF_ISO.get(value)
+    if day is not None:
+        return day, None
+    day = date_ordinal(value)
+    if day and iso_date(day) == value:
+        _DAY_OF_ISO[value] = day
+        return day, None
+    return day, value
+
+# Low-cardinality string fields, interned so equal values share one object.
+INTERNED_FIELDS = frozenset(('category', 'trans_type', 'name', 'entry_type'))
 
 class Transaction:
+    __slots__ = ('amount', 'day', '_raw_date', 'description', 'category', 'trans_type', 'id')
+
     def __init__(self, amount: float, date: str, description: str, category: str, trans_type: str):
         self.amount = amount
-        self.date = date  # ISO format string
+        self.date = date  # ISO format string, stored as the `day` ordinal
         self.description = description
-        self.category = category
-        self.trans_type = trans_type  # 'income' or 'expense'
+        self.category = sys.intern(category)
+        self.trans_type = sys.intern(trans_type)  # 'income' or 'expense'
+        self.id: Optional[int] = None  # assigned by LedgerManager, persisted
+
+    @property
+    def date(self) -> str:
+        return iso_date(self.day) if self._raw_date is None else self._raw_date
+
+    @date.setter
+    def date(self, value: str):
+        self.day, self._raw_date = _parse_date(value)
 
     def to_dict(self) -> Dict:
         return {
@@ -16,26 +84,28 @@ class Transaction:
             'date': self.date,
             'description': self.description,
             'category': self.category,
-            'trans_type': self.trans_type
+            'trans_type': self.trans_type,
+            'id': self.id
         }
 
     @staticmethod
     def from_dict(data: Dict) -> 'Transaction':
-        return Transaction(
-            amount=data['amount'],
-            date=data['date'],
-            description=data['description'],
-            category=data['category'],
-            trans_type=data['trans_type']
-        )
+        t = Transaction(data['amount'], data['date'], data['description'], data['category'], data['trans_type'])
+        t.id = data.get('id')
+        return t
 
 class PersonLedgerEntry:
+    __slots__ = ('name', 'amount', 'description', 'day', '_raw_date', 'entry_type', 'id')
+
     def __init__(self, name: str, amount: float, description: str, date: str, entry_type: str):
-        self.name = name
+        self.name = sys.intern(name)
         self.amount = amount
         self.description = description
-        self.date = date  # ISO format string
-        self.entry_type = entry_type  # 'to_give' or 'to_receive'
+        self.date = date  # ISO format string, stored as the `day` ordinal
+        self.entry_type = sys.intern(entry_type)  # 'to_give' or 'to_receive'
+        self.id: Optional[int] = None  # assigned by LedgerManager, persisted
+
+    date = Transaction.date
 
     def to_dict(self) -> Dict:
         return {
@@ -43,44 +113,1001 @@ class PersonLedgerEntry:
             'amount': self.amount,
             'description': self.description,
             'date': self.date,
-            'entry_type': self.entry_type
+            'entry_type': self.entry_type,
+            'id': self.id
         }
 
     @staticmethod
     def from_dict(data: Dict) -> 'PersonLedgerEntry':
-        return PersonLedgerEntry(
-            name=data['name'],
-            amount=data['amount'],
-            description=data['description'],
-            date=data['date'],
-            entry_type=data['entry_type']
+        entry = PersonLedgerEntry(data['name'], data['amount'], data['description'], data['date'], data['entry_type'])
+        entry.id = data.get('id')
+        return entry
+
+TRANSACTION_FIELDS = ('amount', 'date', 'description', 'category', 'trans_type')
+LEDGER_ENTRY_FIELDS = ('name', 'amount', 'description', 'date', 'entry_type')
+
+# Listener signature: callback(kind, action, records) where kind is
+# 'transaction' or 'ledger_entry' and action is 'added', 'updated',
+# 'deleted' or 'reset'. 'reset' carries no records.
+ChangeListener = Callable[[str, str, List], None]
+
+def date_ordinal(iso_date: str) -> int:
+    """
+    Convert an ISO date string to a proleptic Gregorian day ordinal.
+    Returns 0 for strings that are not ISO dates so they sort before any real date.
+    """
+    try:
+        return date.fromisoformat(iso_date[:10]).toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+def month_end(month: str) -> str:
+    """Last day of a yyyy-mm month as an ISO date string."""
+    year, month_number = int(month[:4]), int(month[5:7])
+    first_of_next = date(year + month_number // 12, month_number % 12 + 1, 1)
+    return (first_of_next - timedelta(days=1)).isoformat()
+
+def dump_json(data) -> bytes:
+    """Compact UTF-8 encoded JSON."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    if ujson is not None:
+        return ujson.dumps(data, ensure_ascii=False).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def load_json(raw: bytes):
+    if orjson is not None:
+        return orjson.loads(raw)
+    if ujson is not None:
+        return ujson.loads(raw)
+    return json.loads(raw)
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# What may follow a decoded prefix of a number that continues in the next chunk ("2." or "1.5e-").
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+_decoder = json.JSONDecoder()
+
+class _JsonReader:
+    """A text file read in chunks, decoded one JSON value at a time."""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+
+    def fill(self) -> bool:
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character, without consuming it."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError('Unexpected end of JSON data')
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f'Expected {char!r} in JSON data, found {self.buf[self.pos]!r}')
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Either invalid or cut off by the chunk boundary; only more data can tell.
+                if not self.fill():
+                    raise
+                continue
+            # A number near the buffer end may have decoded only in part; if
+            # nothing but number characters follows, read on and decode again.
+            if _NUMBER_TAIL.fullmatch(self.buf, end) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+def iter_json_object(f, chunk_size: int = 1 << 20) -> Iterator[Tuple[str, object]]:
+    """
+    Incrementally parse a text file holding one JSON object.
+
+    Yields (key, item) for every element of an array value and (key, value)
+    for any other value, so the arrays are never materialised in full.
+    """
+    reader = _JsonReader(f, chunk_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if reader.peek() == '[':
+            reader.pos += 1
+            if reader.peek() != ']':
+                while True:
+                    yield key, reader.value()
+                    if reader.peek() != ',':
+                        break
+                    reader.pos += 1
+            reader.expect(']')
+        else:
+            yield key, reader.value()
+        if reader.peek() != ',':
+            break
+        reader.pos += 1
+    reader.expect('}')
+
+def _within_lower(bound, other) -> bool:
+    return other is None or (bound is not None and bound >= other)
+
+def _within_upper(bound, other) -> bool:
+    return other is None or (bound is not None and bound <= other)
+
+class TransactionFilter:
+    def __init__(self, category: Optional[str] = None, date_from: Optional[str] = None,
+                 date_to: Optional[str] = None, min_amount: Optional[float] = None,
+                 max_amount: Optional[float] = None, description: Optional[str] = None):
+        self.category = category
+        self.date_from = date_from  # ISO format string, inclusive
+        self.date_to = date_to  # ISO format string, inclusive
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.description = description.lower() if description else None
+        self._day_from = None if date_from is None else date_ordinal(date_from)
+        self._day_to = None if date_to is None else date_ordinal(date_to)
+
+    def matches(self, t: Transaction) -> bool:
+        if not self.matches_fields(t):
+            return False
+        return not self.description or self.description in t.description.lower()
+
+    def matches_fields(self, t: Transaction) -> bool:
+        """Every criterion except the description search."""
+        if self.category is not None and t.category != self.category:
+            return False
+        if self._day_from is not None and t.day < self._day_from:
+            return False
+        if self._day_to is not None and t.day > self._day_to:
+            return False
+        if self.min_amount is not None and t.amount < self.min_amount:
+            return False
+        if self.max_amount is not None and t.amount > self.max_amount:
+            return False
+        return True
+
+    def narrows(self, other: 'TransactionFilter') -> bool:
+        """True if everything this filter matches is also matched by `other`."""
+        return (
+            (other.category is None or self.category == other.category)
+            and _within_lower(self._day_from, other._day_from)
+            and _within_upper(self._day_to, other._day_to)
+            and _within_lower(self.min_amount, other.min_amount)
+            and _within_upper(self.max_amount, other.max_amount)
+            and (not other.description or (self.description is not None and other.description in self.description))
         )
 
+_date_key = operator.attrgetter('day', 'id')
+
+class DateIndex:
+    """
+    Transactions kept sorted by (date ordinal, id).
+
+    Range queries bisect into the sorted keys, so they cost O(log N + k).
+    """
+
+    def __init__(self):
+        self.keys: List[Tuple[int, int]] = []
+        self.records: List[Transaction] = []
+
+    def add(self, t: Transaction):
+        key = (t.day, t.id)
+        pos = bisect.bisect_left(self.keys, key)
+        self.keys.insert(pos, key)
+        self.records.insert(pos, t)
+
+    def extend(self, transactions: List[Transaction]):
+        """Add a batch by merging it, sorted, into the keys: O(N + k) rather than an O(N) insert per record."""
+        batch = sorted(transactions, key=_date_key)
+        if not self.records:
+            self.keys = [(t.day, t.id) for t in batch]
+            self.records = batch
+            return
+        old_keys, old_records = self.keys, self.records
+        keys, records = [], []
+        start = 0
+        for t in batch:
+            key = (t.day, t.id)
+            pos = bisect.bisect_left(old_keys, key, start)
+            keys += old_keys[start:pos]
+            records += old_records[start:pos]
+            keys.append(key)
+            records.append(t)
+            start = pos
+        keys += old_keys[start:]
+        records += old_records[start:]
+        self.keys, self.records = keys, records
+
+    def update(self, old: Transaction, t: Transaction):
+        if old.day != t.day:
+            self.remove(old)
+            self.add(t)
+
+    def remove(self, t: Transaction):
+        pos = bisect.bisect_left(self.keys, (t.day, t.id))
+        del self.keys[pos]
+        del self.records[pos]
+
+    def rebuild(self, transactions: List[Transaction]):
+        self.keys = []
+        self.records = []
+        self.extend(transactions)
+
+    def bounds(self, date_from: Optional[str], date_to: Optional[str]) -> Tuple[int, int]:
+        """Return the [lo, hi) slice of `records` dated within the inclusive ISO range."""
+        lo = 0 if date_from is None else bisect.bisect_left(self.keys, (date_ordinal(date_from),))
+        hi = len(self.keys) if date_to is None else bisect.bisect_left(self.keys, (date_ordinal(date_to) + 1,))
+        return lo, max(lo, hi)
+
+    def between(self, date_from: Optional[str], date_to: Optional[str]) -> List[Transaction]:
+        lo, hi = self.bounds(date_from, date_to)
+        return self.records[lo:hi]
+
+class TransactionColumns:
+    """
+    Array-backed copy of the filterable transaction fields.
+
+    Each transaction occupies one slot: amounts are float64, dates are int32
+    day ordinals and category/type are dictionary-encoded int32 codes.
+    Slots keep insertion order; deleted slots are marked dead and reclaimed
+    once they outnumber the live ones. Requires numpy.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.dead = 0
+        self.records: List[Optional[Transaction]] = []
+        self.slots: Dict[int, int] = {}
+        self.category_codes: Dict[str, int] = {}
+        self.type_codes: Dict[str, int] = {}
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        self.amounts = np.zeros(capacity, dtype=np.float64)
+        self.dates = np.zeros(capacity, dtype=np.int32)
+        self.categories = np.zeros(capacity, dtype=np.int32)
+        self.types = np.zeros(capacity, dtype=np.int32)
+        self.live = np.zeros(capacity, dtype=bool)
+
+    def _grow(self):
+        size = self.size
+        old = (self.amounts, self.dates, self.categories, self.types, self.live)
+        self._allocate(max(1024, 2 * len(self.amounts)))
+        for new, current in zip((self.amounts, self.dates, self.categories, self.types, self.live), old):
+            new[:size] = current[:size]
+
+    @staticmethod
+    def _code(codes: Dict[str, int], value: str) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+        return code
+
+    def _write(self, slot: int, t: Transaction):
+        self.amounts[slot] = float(t.amount)
+        self.dates[slot] = t.day
+        self.categories[slot] = self._code(self.category_codes, t.category)
+        self.types[slot] = self._code(self.type_codes, t.trans_type)
+        self.live[slot] = True
+
+    def add(self, t: Transaction):
+        if self.size == len(self.amounts):
+            self._grow()
+        slot = self.size
+        self._write(slot, t)
+        self.records.append(t)
+        self.slots[t.id] = slot
+        self.size += 1
+
+    def extend(self, transactions: List[Transaction]):
+        start = self.size
+        end = start + len(transactions)
+        while end > len(self.amounts):
+            self._grow()
+        self.amounts[start:end] = [float(t.amount) for t in transactions]
+        self.dates[start:end] = [t.day for t in transactions]
+        self.categories[start:end] = [self._code(self.category_codes, t.category) for t in transactions]
+        self.types[start:end] = [self._code(self.type_codes, t.trans_type) for t in transactions]
+        self.live[start:end] = True
+        self.records.extend(transactions)
+        self.slots.update((t.id, slot) for slot, t in enumerate(transactions, start))
+        self.size = end
+
+    def update(self, old: Transaction, t: Transaction):
+        self._write(self.slots[t.id], t)
+
+    def remove(self, t: Transaction):
+        slot = self.slots.pop(t.id)
+        self.live[slot] = False
+        self.records[slot] = None
+        self.dead += 1
+        if self.dead > 1024 and self.dead * 2 > self.size:
+            self.rebuild([r for r in self.records if r is not None])
+
+    def rebuild(self, transactions: List[Transaction]):
+        n = len(transactions)
+        self.size = n
+        self.dead = 0
+        self.records = list(transactions)
+        self.slots = {t.id: slot for slot, t in enumerate(transactions)}
+        self._allocate(max(1024, n))
+        self.amounts[:n] = [float(t.amount) for t in transactions]
+        self.dates[:n] = [t.day for t in transactions]
+        self.categories[:n] = [self._code(self.category_codes, t.category) for t in transactions]
+        self.types[:n] = [self._code(self.type_codes, t.trans_type) for t in transactions]
+        self.live[:n] = True
+
+    def select(self, criteria: TransactionFilter) -> 'np.ndarray':
+        """Return the slots matching every criterion except the description, in insertion order."""
+        n = self.size
+        mask = self.live[:n].copy()
+        if criteria.category is not None:
+            code = self.category_codes.get(criteria.category)
+            if code is None:
+                return np.empty(0, dtype=np.intp)
+            mask &= self.categories[:n] == code
+        if criteria.date_from is not None:
+            mask &= self.dates[:n] >= date_ordinal(criteria.date_from)
+        if criteria.date_to is not None:
+            mask &= self.dates[:n] <= date_ordinal(criteria.date_to)
+        if criteria.min_amount is not None:
+            mask &= self.amounts[:n] >= criteria.min_amount
+        if criteria.max_amount is not None:
+            mask &= self.amounts[:n] <= criteria.max_amount
+        return np.flatnonzero(mask)
+
+class MonthlyAggregates:
+    """
+    Materialized (month, category, trans_type) -> [sum, count] cells, plus
+    the number of transactions in each category.
+
+    Every mutation touches exactly one cell (two for an edit), so keeping
+    the totals current is O(1) per change regardless of ledger size.
+    """
+
+    def __init__(self):
+        self.months: Dict[str, Dict[Tuple[str, str], List]] = {}
+        self.categories: Dict[str, int] = {}
+
+    def _adjust(self, t: Transaction, sign: int):
+        count = self.categories.get(t.category, 0) + sign
+        if count:
+            self.categories[t.category] = count
+        else:
+            del self.categories[t.category]
+        month = t.date[:7]  # yyyy-mm
+        cells = self.months.setdefault(month, {})
+        cell = cells.setdefault((t.category, t.trans_type), [0.0, 0])
+        cell[0] += sign * t.amount
+        cell[1] += sign
+        if cell[1] == 0:
+            del cells[(t.category, t.trans_type)]
+            if not cells:
+                del self.months[month]
+
+    def add(self, t: Transaction):
+        self._adjust(t, 1)
+
+    def update(self, old: Transaction, t: Transaction):
+        self._adjust(old, -1)
+        self._adjust(t, 1)
+
+    def remove(self, t: Transaction):
+        self._adjust(t, -1)
+
+    def extend(self, transactions: List[Transaction]):
+        # _adjust(t, 1) inlined, with each distinct day's month derived once:
+        # this runs over every record of a load or import.
+        months, categories = self.months, self.categories
+        month_of_day: Dict[int, str] = {}
+        for t in transactions:
+            categories[t.category] = categories.get(t.category, 0) + 1
+            month = month_of_day.get(t.day) if t._raw_date is None else None
+            if month is None:
+                month = t.date[:7]  # yyyy-mm
+                if t._raw_date is None:
+                    month_of_day[t.day] = month
+            cells = months.get(month)
+            if cells is None:
+                cells = months[month] = {}
+            cell = cells.get((t.category, t.trans_type))
+            if cell is None:
+                cells[(t.category, t.trans_type)] = [t.amount, 1]
+            else:
+                cell[0] += t.amount
+                cell[1] += 1
+
+    def rebuild(self, transactions: List[Transaction]):
+        self.months = {}
+        self.categories = {}
+        self.extend(transactions)
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class DescriptionIndex:
+    """
+    Trigram index over lowercased transaction descriptions.
+
+    Every three-character slice of ' ' + description maps to an array of the
+    ids that contain it; the leading space lets word prefixes be looked up
+    too. A query takes the shortest postings among its trigrams and checks
+    those candidates against the descriptions, so its cost follows the
+    number of candidates rather than the ledger size. Queries shorter than
+    three characters cannot use the postings and scan the descriptions.
+
+    Building the postings costs more than the rest of a load and many
+    sessions never search, so they are built by the first lookup and kept
+    current from then on.
+    """
+
+    def __init__(self, records: Callable[[], Dict[int, Transaction]]):
+        self.records = records  # the manager's id -> transaction map
+        self.grams: Optional[Dict[str, array]] = None  # None until the first lookup
+
+    def add(self, t: Transaction):
+        if self.grams is not None:
+            self._post(t.id, t.description)
+
+    def update(self, old: Transaction, t: Transaction):
+        if self.grams is not None and old.description != t.description:
+            self._unpost(t.id, old.description)
+            self._post(t.id, t.description)
+
+    def remove(self, t: Transaction):
+        if self.grams is not None:
+            self._unpost(t.id, t.description)
+
+    def extend(self, transactions: List[Transaction]):
+        if self.grams is not None:
+            for t in transactions:
+                self._post(t.id, t.description)
+
+    def rebuild(self, transactions: List[Transaction]):
+        self.grams = None
+
+    def _post(self, transaction_id: int, description: str):
+        grams = self.grams
+        for gram in _trigrams(' ' + description.lower()):
+            grams[gram].append(transaction_id)
+
+    def _unpost(self, transaction_id: int, description: str):
+        grams = self.grams
+        for gram in _trigrams(' ' + description.lower()):
+            ids = grams[gram]
+            ids.remove(transaction_id)
+            if not ids:
+                del grams[gram]
+
+    def _postings(self) -> Dict[str, array]:
+        if self.grams is None:
+            # _post() inlined: this runs over every record.
+            grams = self.grams = defaultdict(lambda: array('I'))
+            for i, t in self.records().items():
+                padded = ' ' + t.description.lower()
+                for gram in {padded[j:j + 3] for j in range(len(padded) - 2)}:
+                    grams[gram].append(i)
+        return self.grams
+
+    def lookup(self, text: str, prefix: bool = False) -> Optional[Set[int]]:
+        """
+        Ids whose description contains the lowercase `text` (or, with
+        `prefix`, has a word starting with it). None if `text` is too short
+        for the index.
+        """
+        key = ' ' + text if prefix else text
+        if len(key) < 3:
+            return None
+        grams = self._postings()
+        postings = min((grams.get(gram, ()) for gram in _trigrams(key)), key=len)
+        # A three-character key is its own only trigram, so its postings are
+        # exact, unless it starts with a space: that trigram may come from the
+        # padding, which a plain substring must not match (' ub' vs 'Uber').
+        if len(key) == 3 and (prefix or text[0] != ' '):
+            return set(postings)
+        records = self.records()
+        return {i for i in postings if self._contains(records[i].description.lower(), text, prefix)}
+
+    def filter(self, transactions: Iterable[Transaction], text: str) -> List[Transaction]:
+        """The transactions whose description contains the lowercase `text`."""
+        return [t for t in transactions if text in t.description.lower()]
+
+    def search(self, query: str) -> Set[int]:
+        """
+        Ids matching every whitespace-separated term of `query`. A term is a
+        substring match, or a word-prefix match when it ends with '*'.
+        """
+        terms = [(term[:-1], True) if term.endswith('*') else (term, False) for term in query.lower().split()]
+        terms = [(text, prefix) for text, prefix in terms if text]
+        if not terms:
+            return set()
+        ids = None
+        unindexed = []
+        for text, prefix in sorted(terms, key=lambda term: -len(term[0])):
+            found = self.lookup(text, prefix)
+            if found is None:
+                unindexed.append((text, prefix))
+            else:
+                ids = found if ids is None else ids & found
+            if ids is not None and not ids:
+                return ids
+        records = self.records()
+        if not unindexed:
+            return ids
+        if ids is None:
+            ids = records.keys()
+        matched = set()
+        for i in ids:
+            lowered = records[i].description.lower()
+            if all(self._contains(lowered, text, prefix) for text, prefix in unindexed):
+                matched.add(i)
+        return matched
+
+    @staticmethod
+    def _contains(lowered: str, text: str, prefix: bool) -> bool:
+        if prefix:
+            return lowered.startswith(text) or ' ' + text in lowered
+        return text in lowered
+
+def _add_to_sum(sums: Dict[str, float], counts: Dict, count_key, key: str, amount: float, sign: int):
+    # A sum is dropped with its last entry rather than left as float residue like 1e-16.
+    count = counts[count_key] = counts.get(count_key, 0) + sign
+    if count == 0:
+        del counts[count_key]
+        del sums[key]
+    else:
+        sums[key] = sums.get(key, 0.0) + amount
+
+class LedgerBalances:
+    """
+    Running to_give/to_receive sums per person and overall.
+
+    Like MonthlyAggregates, every mutation adjusts one person's cell, so
+    subtotals never need a pass over the ledger.
+    """
+
+    def __init__(self):
+        self.people: Dict[str, Dict[str, float]] = {}
+        self.totals: Dict[str, float] = {}
+        self._counts: Dict = {}  # entries behind each sum: (name, type) per person, type overall
+
+    def _adjust(self, e: PersonLedgerEntry, sign: int):
+        cell = self.people.setdefault(e.name, {})
+        _add_to_sum(cell, self._counts, (e.name, e.entry_type), e.entry_type, sign * e.amount, sign)
+        if not cell:
+            del self.people[e.name]
+        _add_to_sum(self.totals, self._counts, e.entry_type, e.entry_type, sign * e.amount, sign)
+
+    def add(self, e: PersonLedgerEntry):
+        self._adjust(e, 1)
+
+    def update(self, old: PersonLedgerEntry, e: PersonLedgerEntry):
+        self._adjust(old, -1)
+        self._adjust(e, 1)
+
+    def remove(self, e: PersonLedgerEntry):
+        self._adjust(e, -1)
+
+    def rebuild(self, entries: List[PersonLedgerEntry]):
+        self.people = {}
+        self.totals = {}
+        self._counts = {}
+        for e in entries:
+            self._adjust(e, 1)
+
 class LedgerManager:
     def __init__(self):
-        self.transactions: List[Transaction] = []
-        self.ledger_entries: List[PersonLedgerEntry] = []
+        # Records are kept in insertion-ordered dicts keyed by id, so lookups,
+        # edits and deletes by id are O(1).
+        self._transactions: Dict[int, Transaction] = {}
+        self._ledger_entries: Dict[int, PersonLedgerEntry] = {}
+        self.storage: Optional[Storage] = None
+        self._listeners: List[ChangeListener] = []
+        self._muted = False
+        self._next_id = 1
+        # Set by a load that had to give records ids the file did not store.
+        self.assigned_ids = False
+        self.dates = DateIndex()
+        self.aggregates = MonthlyAggregates()
+        self.descriptions = DescriptionIndex(lambda: self._transactions)
+        self.columns: Optional[TransactionColumns] = TransactionColumns() if np is not None else None
+        self._transaction_indexes = [self.dates, self.aggregates, self.descriptions]
+        if self.columns is not None:
+            self._transaction_indexes.append(self.columns)
+        self.balances_index = LedgerBalances()
+        self._ledger_indexes = [self.balances_index]
 
-    def add_transaction(self, transaction: Transaction):
-        self.transactions.append(transaction)
+    @property
+    def transactions(self) -> List[Transaction]:
+        return list(self._transactions.values())
 
-    def add_ledger_entry(self, entry: PersonLedgerEntry):
-        self.ledger_entries.append(entry)
+    @property
+    def ledger_entries(self) -> List[PersonLedgerEntry]:
+        return list(self._ledger_entries.values())
 
-    def save_to_json(self, file_path: str):
-        data = {
-            'transactions': [t.to_dict() for t in self.transactions],
-            'ledger_entries': [e.to_dict() for e in self.ledger_entries]
+    def get_transaction(self, transaction_id: int) -> Transaction:
+        return self._transactions[transaction_id]
+
+    def get_ledger_entry(self, entry_id: int) -> PersonLedgerEntry:
+        return self._ledger_entries[entry_id]
+
+    def categories(self) -> List[str]:
+        """The categories of the current transactions, sorted."""
+        return sorted(self.aggregates.categories)
+
+    def ledger_totals(self) -> Dict[str, float]:
+        """Sum of all ledger entries by entry_type."""
+        return dict(self.balances_index.totals)
+
+    def person_totals(self) -> Dict[str, Dict[str, float]]:
+        """Per-person sums by entry_type, e.g. {'Sam': {'to_give': 20.0}}."""
+        return {name: dict(cell) for name, cell in self.balances_index.people.items()}
+
+    def balances(self) -> Dict[str, float]:
+        """
+        Outstanding net balance per person: positive when they owe you,
+        negative when you owe them. Settled people are left out.
+        """
+        balances = {}
+        for name, cell in self.balances_index.people.items():
+            net = cell.get('to_receive', 0.0) - cell.get('to_give', 0.0)
+            if abs(net) >= 0.005:
+                balances[name] = net
+        return balances
+
+    def filter_transactions(self, criteria: TransactionFilter,
+                            within: Optional[List[Transaction]] = None) -> List[Transaction]:
+        """
+        Transactions matching `criteria`, in id order. `within` may be the
+        current result of a looser filter (see TransactionFilter.narrows);
+        when it is small enough that rescanning it beats the indexes, only
+        those records are checked and their order is kept. A description the
+        trigram index can answer is then intersected with them instead.
+        """
+        desc = criteria.description
+        refine = within is not None and len(within) * 2 < len(self._transactions)
+        ids = self.descriptions.lookup(desc) if desc else None
+        if refine:
+            if ids is not None:
+                return [t for t in within if t.id in ids and criteria.matches_fields(t)]
+            candidates = [t for t in within if criteria.matches_fields(t)]
+        elif ids is not None:
+            # Already verified against the description; only the other fields remain.
+            records = self._transactions
+            return [records[i] for i in sorted(ids) if criteria.matches_fields(records[i])]
+        elif criteria.date_from is not None or criteria.date_to is not None:
+            lo, hi = self.dates.bounds(criteria.date_from, criteria.date_to)
+            # A narrow date window is cheaper to walk than a full columnar scan.
+            if self.columns is None or (hi - lo) * 4 < len(self._transactions):
+                candidates = [t for t in self.dates.records[lo:hi] if criteria.matches_fields(t)]
+                candidates.sort(key=lambda t: t.id)
+            else:
+                candidates = self._select_columns(criteria)
+        elif self.columns is not None:
+            candidates = self._select_columns(criteria)
+        else:
+            candidates = [t for t in self._transactions.values() if criteria.matches_fields(t)]
+        if desc:
+            return self.descriptions.filter(candidates, desc)
+        return candidates
+
+    def search(self, text: str, limit: Optional[int] = None) -> List[Transaction]:
+        """
+        Transactions whose description matches every term of `text`, in id
+        order, at most `limit` of them. Terms match anywhere in the
+        description; a term ending in '*' only matches the start of a word,
+        e.g. search('pizz* hut').
+        """
+        ids = sorted(self.descriptions.search(text))
+        if limit is not None:
+            ids = ids[:limit]
+        return [self._transactions[i] for i in ids]
+
+    def _select_columns(self, criteria: TransactionFilter) -> List[Transaction]:
+        records = self.columns.records
+        return [records[slot] for slot in self.columns.select(criteria)]
+
+    def monthly_totals(self, criteria: TransactionFilter) -> Optional[Dict[str, Dict[str, float]]]:
+        """
+        Per-month sums by trans_type for the transactions matching `criteria`.
+        Whole months come straight from the materialized aggregates; only a
+        partially covered first or last month is summed from the date index.
+        Returns None when the criteria filter on amount or description, which
+        the aggregates cannot answer.
+        """
+        if criteria.min_amount is not None or criteria.max_amount is not None or criteria.description:
+            return None
+        first = criteria.date_from[:7] if criteria.date_from else None
+        last = criteria.date_to[:7] if criteria.date_to else None
+        partial = set()
+        if first and criteria.date_from[:10] != first + '-01':
+            partial.add(first)
+        if last and criteria.date_to[:10] != month_end(last):
+            partial.add(last)
+        totals = defaultdict(lambda: defaultdict(float))
+        for month, cells in self.aggregates.months.items():
+            if (first and month < first) or (last and month > last) or month in partial:
+                continue
+            for (category, trans_type), (amount, count) in cells.items():
+                if criteria.category is None or category == criteria.category:
+                    totals[month][trans_type] += amount
+        for month in partial:
+            date_from = max(criteria.date_from or '', month + '-01')
+            date_to = min(criteria.date_to or '9999-12-31', month_end(month))
+            for t in self.dates.between(date_from, date_to):
+                if criteria.category is None or t.category == criteria.category:
+                    totals[month][t.trans_type] += t.amount
+        return totals
+
+    def open_storage(self, file_path: str, backend: Optional[str] = None, save_delay: Optional[float] = None):
+        """
+        Load from and persist every change to `file_path` (see storage.open_store).
+        With `save_delay`, writes reach the disk from a background thread once
+        changes have been quiet for that many seconds (see storage.SaveScheduler).
+        If loading fails the manager is left without storage.
+        """
+        store = open_store(file_path, self, backend)
+        store.load()
+        self.storage = store if save_delay is None else SaveScheduler(store, save_delay)
+
+    def close(self):
+        if self.storage is not None:
+            self.storage.close()
+            self.storage = None
+
+    def defer_sync(self):
+        """Buffer storage writes until flush(), e.g. while an import adds many batches."""
+        if self.storage is not None:
+            self.storage.auto_sync = False
+
+    def flush(self):
+        if self.storage is not None:
+            self.storage.sync()
+            self.storage.auto_sync = True
+
+    def subscribe(self, listener: ChangeListener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: ChangeListener):
+        self._listeners.remove(listener)
+
+    def mute(self):
+        """Stop notifying listeners until unmute(), e.g. while another thread loads."""
+        self._muted = True
+
+    def unmute(self):
+        """Resume notifications with a 'reset' of each kind, as listeners missed every change meanwhile."""
+        self._muted = False
+        self._notify('transaction', 'reset', [])
+        self._notify('ledger_entry', 'reset', [])
+
+    def add_transaction(self, transaction: Transaction) -> int:
+        self._insert_transaction(transaction)
+        self._log('add_transaction', data=transaction.to_dict())
+        self._notify('transaction', 'added', [transaction])
+        return transaction.id
+
+    def update_transaction(self, transaction_id: int, **changes) -> Transaction:
+        transaction = self._update_transaction(transaction_id, changes)
+        self._log('update_transaction', id=transaction_id, data=changes)
+        self._notify('transaction', 'updated', [transaction])
+        return transaction
+
+    def delete_transaction(self, transaction_id: int):
+        transaction = self._delete_transaction(transaction_id)
+        self._log('delete_transaction', id=transaction_id)
+        self._notify('transaction', 'deleted', [transaction])
+
+    def add_ledger_entry(self, entry: PersonLedgerEntry) -> int:
+        self._insert_ledger_entry(entry)
+        self._log('add_ledger_entry', data=entry.to_dict())
+        self._notify('ledger_entry', 'added', [entry])
+        return entry.id
+
+    def update_ledger_entry(self, entry_id: int, **changes) -> PersonLedgerEntry:
+        entry = self._update_ledger_entry(entry_id, changes)
+        self._log('update_ledger_entry', id=entry_id, data=changes)
+        self._notify('ledger_entry', 'updated', [entry])
+        return entry
+
+    def delete_ledger_entry(self, entry_id: int):
+        entry = self._delete_ledger_entry(entry_id)
+        self._log('delete_ledger_entry', id=entry_id)
+        self._notify('ledger_entry', 'deleted', [entry])
+
+    def bulk_add(self, transactions: Iterable[Transaction] = (), ledger_entries: Iterable[PersonLedgerEntry] = ()):
+        """Add many records with a single storage write and one notification per kind."""
+        transactions = list(transactions)
+        ledger_entries = list(ledger_entries)
+        if not transactions and not ledger_entries:
+            return
+        self._insert_transactions(transactions)
+        for e in ledger_entries:
+            self._insert_ledger_entry(e)
+        self._log('bulk_add',
+                  transactions=[t.to_dict() for t in transactions],
+                  ledger_entries=[e.to_dict() for e in ledger_entries])
+        if transactions:
+            self._notify('transaction', 'added', transactions)
+        if ledger_entries:
+            self._notify('ledger_entry', 'added', ledger_entries)
+
+    def apply_record(self, record: Dict):
+        op = record['op']
+        if op == 'add_transaction':
+            self._insert_transaction(Transaction.from_dict(record['data']))
+        elif op == 'update_transaction':
+            self._update_transaction(record['id'], record['data'])
+        elif op == 'delete_transaction':
+            self._delete_transaction(record['id'])
+        elif op == 'add_ledger_entry':
+            self._insert_ledger_entry(PersonLedgerEntry.from_dict(record['data']))
+        elif op == 'update_ledger_entry':
+            self._update_ledger_entry(record['id'], record['data'])
+        elif op == 'delete_ledger_entry':
+            self._delete_ledger_entry(record['id'])
+        elif op == 'bulk_add':
+            self._insert_transactions([Transaction.from_dict(t) for t in record.get('transactions', [])])
+            for e in record.get('ledger_entries', []):
+                self._insert_ledger_entry(PersonLedgerEntry.from_dict(e))
+        else:
+            raise ValueError(f'Unknown operation: {op}')
+
+    # Secondary indexes are kept in step here, so every mutation path (API
+    # calls, storage replay, bulk loads) maintains them.
+    def _insert_transaction(self, transaction: Transaction):
+        self._insert(self._transactions, transaction)
+        for index in self._transaction_indexes:
+            index.add(transaction)
+
+    def _insert_transactions(self, transactions: List[Transaction]):
+        # Indexes take a batch in one extend(), e.g. one DateIndex merge
+        # instead of a list insert per record.
+        for t in transactions:
+            self._insert(self._transactions, t)
+        for index in self._transaction_indexes:
+            index.extend(transactions)
+
+    def _update_transaction(self, transaction_id: int, changes: Dict) -> Transaction:
+        transaction = self._transactions[transaction_id]
+        old = copy.copy(transaction)
+        self._apply_changes(transaction, TRANSACTION_FIELDS, changes)
+        for index in self._transaction_indexes:
+            index.update(old, transaction)
+        return transaction
+
+    def _delete_transaction(self, transaction_id: int) -> Transaction:
+        transaction = self._transactions.pop(transaction_id)
+        for index in self._transaction_indexes:
+            index.remove(transaction)
+        return transaction
+
+    def _insert_ledger_entry(self, entry: PersonLedgerEntry):
+        self._insert(self._ledger_entries, entry)
+        for index in self._ledger_indexes:
+            index.add(entry)
+
+    def _update_ledger_entry(self, entry_id: int, changes: Dict) -> PersonLedgerEntry:
+        entry = self._ledger_entries[entry_id]
+        old = copy.copy(entry)
+        self._apply_changes(entry, LEDGER_ENTRY_FIELDS, changes)
+        for index in self._ledger_indexes:
+            index.update(old, entry)
+        return entry
+
+    def _delete_ledger_entry(self, entry_id: int) -> PersonLedgerEntry:
+        entry = self._ledger_entries.pop(entry_id)
+        for index in self._ledger_indexes:
+            index.remove(entry)
+        return entry
+
+    def _insert(self, index: Dict, record):
+        if record.id is None:
+            record.id = self._next_id
+        elif record.id in index:
+            raise ValueError(f'Duplicate id: {record.id}')
+        self._next_id = max(self._next_id, record.id + 1)
+        index[record.id] = record
+
+    @staticmethod
+    def _apply_changes(record, fields, changes: Dict):
+        unknown = set(changes) - set(fields)
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))}')
+        for name, value in changes.items():
+            if name in INTERNED_FIELDS:
+                value = sys.intern(value)
+            setattr(record, name, value)
+
+    def _notify(self, kind: str, action: str, records: List):
+        if self._muted:
+            return
+        for listener in list(self._listeners):
+            listener(kind, action, records)
+
+    def _log(self, op: str, **fields):
+        if self.storage is not None:
+            self.storage.append(op, fields)
+
+    def to_dict(self) -> Dict:
+        # list() copies the values in one step, so a storage thread can call
+        # this while the owning thread keeps adding and removing records.
+        return {
+            'transactions': [t.to_dict() for t in list(self._transactions.values())],
+            'ledger_entries': [e.to_dict() for e in list(self._ledger_entries.values())]
         }
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
 
-    def load_from_json(self, file_path: str):
+    def load_from_dict(self, data: Dict):
+        self._load_records([Transaction.from_dict(t) for t in data.get('transactions', [])],
+                           [PersonLedgerEntry.from_dict(e) for e in data.get('ledger_entries', [])])
+
+    def _load_records(self, transactions: List[Transaction], ledger_entries: List[PersonLedgerEntry]):
+        # Files written before ids existed get fresh ids above any stored one.
+        self._next_id = 1 + max((r.id for r in transactions + ledger_entries if r.id is not None), default=0)
+        self.assigned_ids = any(r.id is None for r in transactions + ledger_entries)
+        self._transactions = {}
+        self._ledger_entries = {}
+        for t in transactions:
+            self._insert(self._transactions, t)
+        for e in ledger_entries:
+            self._insert(self._ledger_entries, e)
+        for index in self._transaction_indexes:
+            index.rebuild(transactions)
+        for index in self._ledger_indexes:
+            index.rebuild(ledger_entries)
+        self._notify('transaction', 'reset', [])
+        self._notify('ledger_entry', 'reset', [])
+
+    @instrument.timed()
+    def save_to_json(self, file_path: str):
+        with open(file_path, 'wb') as f:
+            f.write(dump_json(self.to_dict()))
+
+    @instrument.timed()
+    def load_from_json(self, file_path: str, stream: Optional[bool] = None) -> Dict:
+        """
+        Load a file in the to_dict() format and return its remaining top-level
+        fields (a journal snapshot's 'seq', for instance). Files larger than
+        STREAM_THRESHOLD are streamed unless `stream` says otherwise.
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            self.transactions = [Transaction.from_dict(t) for t in data.get('transactions', [])]
-            self.ledger_entries = [PersonLedgerEntry.from_dict(e) for e in data.get('ledger_entries', [])]
+            if stream is None:
+                stream = os.path.getsize(file_path) > STREAM_THRESHOLD
+            if stream:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    return self._load_stream(iter_json_object(f))
+            with open(file_path, 'rb') as f:
+                data = load_json(f.read())
         except FileNotFoundError:
-            self.transactions = []
-            self.ledger_entries = [] 
\ No newline at end of file
+            data = {}
+        self.load_from_dict(data)
+        return {key: value for key, value in data.items() if key not in ('transactions', 'ledger_entries')}
+
+    def _load_stream(self, items: Iterable[Tuple[str, object]]) -> Dict:
+        transactions, ledger_entries, extra = [], [], {}
+        for key, value in items:
+            if key == 'transactions':
+                transactions.append(Transaction.from_dict(value))
+            elif key == 'ledger_entries':
+                ledger_entries.append(PersonLedgerEntry.from_dict(value))
+            else:
+                extra[key] = value
+        self._load_records(transactions, ledger_entries)
+        return extra
\ No newline at end of file
@@ -0,0 +1,148 @@
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+from models import LedgerManager, Transaction, TransactionFilter
+from storage import SqliteStore, backend_for, data_exists, open_store
+from utils import iter_csv_records, transaction_from_csv_row, ledger_entry_from_csv_row, tag_uncategorized
+
+# The reports read either a loaded manager or an SQLite database directly,
+# which answers them from its indexes without loading every row.
+Source = Union[LedgerManager, SqliteStore]
+
+# Per import kind: the CSV row parser and an optional pass over each parsed
+# batch (auto-tagging blank transaction categories).
+IMPORTERS = {
+    'transactions': (transaction_from_csv_row, tag_uncategorized),
+    'ledger': (ledger_entry_from_csv_row, None),
+}
+
+
+def open_source(path: str, backend: Optional[str] = None) -> Source:
+    """
+    Open a data file for the reports without writing to it, so it is safe
+    while the GUI has the file open. An SQLite database is queried in place;
+    the JSON backends are read into a manager without storage.
+    """
+    if not data_exists(path):
+        raise FileNotFoundError(f'No such data file: {path}')
+    if (backend or backend_for(path)) == 'sqlite':
+        return open_store(path, None, 'sqlite', read_only=True)
+    manager = LedgerManager()
+    open_store(path, manager, backend, read_only=True).read()
+    return manager
+
+
+def load_source(source: Source) -> LedgerManager:
+    """A manager holding all of `source`, for what only the in-memory indexes answer (search)."""
+    if isinstance(source, SqliteStore):
+        manager = LedgerManager()
+        source.manager = manager
+        source.read()
+        return manager
+    return source
+
+
+def filter_transactions(manager: Source, criteria: Optional[TransactionFilter] = None,
+                        within: Optional[List[Transaction]] = None) -> List[Transaction]:
+    """
+    Transactions matching `criteria` (everything if None). When `within` is
+    the current result of a looser filter it may be refined instead of
+    rescanning the ledger (see LedgerManager.filter_transactions).
+    """
+    if isinstance(manager, SqliteStore):
+        return [Transaction.from_dict(row) for row in manager.query_transactions(criteria or TransactionFilter())]
+    return manager.filter_transactions(criteria or TransactionFilter(), within=within)
+
+
+def monthly_summary(manager: Source, criteria: Optional[TransactionFilter] = None,
+                    rows: Optional[List[Transaction]] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Income and expense totals per yyyy-mm month for the transactions matching
+    `criteria`, in month order. Months without income or expense are left
+    out. Amount and description filters cannot use the materialized
+    aggregates, so the matching `rows` are grouped instead (and computed if
+    the caller does not already have them).
+    """
+    criteria = criteria or TransactionFilter()
+    totals = manager.monthly_totals(criteria)  # an SqliteStore answers every filter
+    if totals is None:
+        totals = defaultdict(lambda: defaultdict(float))
+        for t in rows if rows is not None else manager.filter_transactions(criteria):
+            totals[t.date[:7]][t.trans_type] += t.amount  # yyyy-mm
+    return {
+        month: {'income': totals[month].get('income', 0.0), 'expense': totals[month].get('expense', 0.0)}
+        for month in sorted(totals) if 'income' in totals[month] or 'expense' in totals[month]
+    }
+
+
+def ledger_balances(manager: Source) -> Dict:
+    """
+    Ledger subtotals: {'to_give', 'to_receive', 'net'} overall plus 'people',
+    the sums by entry_type of each person with entries, in name order.
+    """
+    people = manager.person_totals()
+    if isinstance(manager, SqliteStore):
+        totals = defaultdict(float)
+        for cell in people.values():
+            for entry_type, amount in cell.items():
+                totals[entry_type] += amount
+    else:
+        totals = manager.ledger_totals()
+    to_give = totals.get('to_give', 0.0)
+    to_receive = totals.get('to_receive', 0.0)
+    return {
+        'to_give': to_give,
+        'to_receive': to_receive,
+        'net': to_receive - to_give,
+        'people': {name: people[name] for name in sorted(people)
+                   if 'to_give' in people[name] or 'to_receive' in people[name]},
+    }
+
+
+def parse_batches(path: str, kind: str, errors: List[str], progress: Optional[Callable[[int], None]] = None,
+                  batch_size: int = 5000, stop: Optional[Callable[[], bool]] = None) -> Iterator[List]:
+    """
+    Parse a CSV export of `kind` ('transactions' or 'ledger') into batches of
+    records ready for add_batch(). Rejected rows are appended to `errors` as
+    'Line N: reason'. When `stop` returns True the partial batch is dropped
+    and parsing ends.
+    """
+    parse_row, prepare = IMPORTERS[kind]
+    batch = []
+    for line, record, error in iter_csv_records(path, parse_row, progress):
+        if stop is not None and stop():
+            return
+        if error is not None:
+            errors.append(f'Line {line}: {error}')
+            continue
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield prepare(batch) if prepare else batch
+            batch = []
+    if batch:
+        yield prepare(batch) if prepare else batch
+
+
+def add_batch(manager: LedgerManager, kind: str, records: List):
+    if kind == 'transactions':
+        manager.bulk_add(transactions=records)
+    else:
+        manager.bulk_add(ledger_entries=records)
+
+
+def import_rows(manager: LedgerManager, path: str, kind: str, batch_size: int = 5000,
+                progress: Optional[Callable[[int], None]] = None) -> Dict:
+    """
+    Import a CSV export into `manager` on the calling thread, with one storage
+    sync at the end. Returns {'imported': count, 'errors': [messages]}.
+    """
+    errors = []
+    imported = 0
+    manager.defer_sync()
+    try:
+        for batch in parse_batches(path, kind, errors, progress, batch_size):
+            add_batch(manager, kind, batch)
+            imported += len(batch)
+    finally:
+        manager.flush()
+    return {'imported': imported, 'errors': errors}
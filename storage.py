@@ -0,0 +1,701 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+import instrument
+
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+
+class Storage:
+    """
+    Persistence backend for a LedgerManager.
+
+    The manager calls append() once per mutation with the same operation
+    records that LedgerManager.apply_record understands. With auto_sync
+    off, a backend may buffer writes until sync().
+    """
+
+    def __init__(self, path: str, manager):
+        self.path = path
+        self.manager = manager
+        self.auto_sync = True
+        self.error: Optional[Exception] = None  # set while background writes are failing
+
+    def load(self):
+        raise NotImplementedError
+
+    def read(self):
+        """Load the manager without writing to any file, for reports on data another process may be editing."""
+        self.load()
+
+    def append(self, op: str, fields: Dict):
+        raise NotImplementedError
+
+    def save_all(self, data: Dict):
+        """Replace everything stored with `data` (the LedgerManager.to_dict() format)."""
+        raise NotImplementedError
+
+    def sync(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@instrument.timed()
+def write_json_atomic(path: str, data: Dict):
+    from models import dump_json  # models imports this module
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(dump_json(data))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def fold_journal(data: Dict, records: Iterable[Dict]) -> Dict:
+    """
+    Apply journal records to data in the LedgerManager.to_dict() format, with
+    the same result as LedgerManager.apply_record but on plain dicts, so a
+    snapshot can be brought up to date without a manager.
+    """
+    tables = {kind: {row['id']: row for row in data.get(kind, [])} for kind in ('transactions', 'ledger_entries')}
+    for record in records:
+        op = record['op']
+        if op == 'bulk_add':
+            for kind, table in tables.items():
+                for row in record.get(kind, []):
+                    table[row['id']] = row
+            continue
+        action, _, kind = op.partition('_')  # e.g. 'update', 'ledger_entry'
+        table = tables['transactions' if kind == 'transaction' else 'ledger_entries']
+        if action == 'add':
+            table[record['data']['id']] = record['data']
+        elif action == 'update':
+            table[record['id']] = dict(table[record['id']], **record['data'])
+        elif action == 'delete':
+            del table[record['id']]
+        else:
+            raise ValueError(f'Unknown operation: {op}')
+    return dict(data, **{kind: list(table.values()) for kind, table in tables.items()})
+
+
+class JsonFileStore(Storage):
+    """The whole ledger in one JSON file, rewritten after every change (or every sync() when deferred)."""
+
+    def __init__(self, path: str, manager):
+        super().__init__(path, manager)
+        self.dirty = False
+
+    def load(self):
+        self.manager.load_from_json(self.path)
+
+    def append(self, op: str, fields: Dict):
+        self.dirty = True
+        if self.auto_sync:
+            self.sync()
+
+    def save_all(self, data: Dict):
+        write_json_atomic(self.path, data)
+
+    @instrument.timed()
+    def sync(self):
+        if self.dirty:
+            # Cleared before the snapshot is taken, so a change that races
+            # with the write marks the store dirty again.
+            self.dirty = False
+            try:
+                self.save_all(self.manager.to_dict())
+            except BaseException:
+                self.dirty = True
+                raise
+
+    def close(self):
+        self.sync()
+
+
+class JournalStore(Storage):
+    """
+    Persists a LedgerManager as a JSON snapshot plus an append-only journal.
+
+    Every mutation is appended to '<path>.journal' as one JSON line. Once the
+    journal holds `compact_threshold` records, or more bytes than
+    `compact_bytes` and half the snapshot, it is rotated to
+    '<path>.journal.old' and a background thread folds that into a fresh
+    snapshot (see fold_journal); the live manager is not touched. If that
+    fails, `error` is set and the rotated file is kept and appended to at the
+    next rotation. Each record carries a sequence number and the snapshot
+    stores the last sequence it contains, so replay after a crash at any
+    point applies every record exactly once.
+    """
+
+    def __init__(self, path: str, manager, compact_threshold: int = 1000, compact_bytes: int = 4 << 20):
+        super().__init__(path, manager)
+        self.journal_path = path + '.journal'
+        self.rotated_path = path + '.journal.old'
+        self.compact_threshold = compact_threshold
+        self.compact_bytes = compact_bytes
+        self.seq = 0
+        self.pending = 0
+        self.journal_bytes = 0
+        self.snapshot_bytes = 0
+        self._journal = None
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+
+    def load(self):
+        self._replay(repair=True)
+        if os.path.exists(self.rotated_path) or self.manager.assigned_ids:
+            # A previous compaction did not finish, or the file predates
+            # stored ids and journal records could not be folded into it:
+            # write a new snapshot before appending anything else.
+            self._write_snapshot(self.manager.to_dict(), self.seq)
+            if os.path.exists(self.rotated_path):
+                os.remove(self.rotated_path)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self.pending = 0
+        self.snapshot_bytes = self._size(self.path)
+        self.journal_bytes = self._size(self.journal_path)
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        if self._should_compact():
+            self.compact()
+
+    def read(self):
+        # A compaction in another process replaces files, never rewrites them
+        # in place, so the inodes show whether one raced with the reads.
+        while True:
+            files = self._files()
+            self._replay(repair=False)
+            if self._files() == files:
+                return
+
+    def _replay(self, repair: bool):
+        self.seq = self.manager.load_from_json(self.path).get('seq', 0)
+        self.pending = 0
+        for path in (self.rotated_path, self.journal_path):
+            for record in self._read_journal(path, repair):
+                # The newest records can be in both files if a crash cut
+                # short the append of a journal to a rotated one.
+                if record['seq'] <= self.seq:
+                    continue
+                self.manager.apply_record(record)
+                self.seq = record['seq']
+                self.pending += 1
+
+    def _files(self) -> tuple:
+        inodes = []
+        for path in (self.path, self.rotated_path, self.journal_path):
+            try:
+                inodes.append(os.stat(path).st_ino)
+            except FileNotFoundError:
+                inodes.append(None)
+        return tuple(inodes)
+
+    def append(self, op: str, fields: Dict):
+        with self._lock:
+            self.seq += 1
+            record = {'seq': self.seq, 'op': op}
+            record.update(fields)
+            line = json.dumps(record, separators=(',', ':')) + '\n'
+            self._journal.write(line)
+            if self.auto_sync:
+                self._sync()
+            self.pending += 1
+            self.journal_bytes += len(line)
+        if self._should_compact():
+            self.compact()
+
+    def _should_compact(self) -> bool:
+        # By size too, as a single bulk_add record can hold a whole import.
+        return (self.pending >= self.compact_threshold
+                or self.journal_bytes >= max(self.compact_bytes, self.snapshot_bytes // 2))
+
+    @instrument.timed()
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def compact(self):
+        """Rotate the journal and fold it into the snapshot in the background, unless that is already running."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        with self._lock:
+            self._sync()
+            self._journal.close()
+            if os.path.exists(self.rotated_path):
+                # An earlier compaction failed, so those records are not in
+                # the snapshot yet; keep them and add the newer ones.
+                with open(self.journal_path, 'rb') as journal, open(self.rotated_path, 'ab') as rotated:
+                    shutil.copyfileobj(journal, rotated)
+                    rotated.flush()
+                    os.fsync(rotated.fileno())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.rotated_path)
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+            self.pending = 0
+            self.journal_bytes = 0
+        self._compactor = threading.Thread(target=self._finish_compaction, name='journal-compactor', daemon=True)
+        self._compactor.start()
+
+    def save_all(self, data: Dict):
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            self._write_snapshot(data, self.seq)
+            if os.path.exists(self.rotated_path):
+                os.remove(self.rotated_path)
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = open(self.journal_path, 'w', encoding='utf-8')
+            self.pending = 0
+            self.journal_bytes = 0
+            self.snapshot_bytes = self._size(self.path)
+            self.error = None
+
+    def close(self):
+        if self._compactor is not None:
+            self._compactor.join()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _finish_compaction(self):
+        from models import load_json  # models imports this module
+        try:
+            try:
+                with open(self.path, 'rb') as f:
+                    data = load_json(f.read())
+            except FileNotFoundError:
+                data = {}
+            seq = data.pop('seq', 0)
+            records = [record for record in self._read_journal(self.rotated_path) if record['seq'] > seq]
+            if records:
+                seq = records[-1]['seq']
+            self._write_snapshot(fold_journal(data, records), seq)
+            os.remove(self.rotated_path)
+            self.snapshot_bytes = self._size(self.path)
+            self.error = None
+        except Exception as e:
+            # The rotated journal stays; the next compaction or load retries.
+            self.error = e
+
+    def _write_snapshot(self, data: Dict, seq: int):
+        write_json_atomic(self.path, dict(data, seq=seq))
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _read_journal(path: str, repair: bool = True):
+        """
+        Yield the records of a journal file. A torn last line, left by a crash
+        mid-write, is cut off (with `repair`) so that records appended later
+        stay readable.
+        """
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            good = 0
+            for line in f:
+                try:
+                    record = json.loads(line) if line.endswith(b'\n') else None
+                except ValueError:
+                    record = None
+                if record is None:
+                    break
+                good += len(line)
+                yield record
+            else:
+                return
+        if repair:
+            os.truncate(path, good)
+
+
+TRANSACTION_COLUMNS = ('id', 'amount', 'date', 'description', 'category', 'trans_type')
+LEDGER_ENTRY_COLUMNS = ('id', 'name', 'amount', 'description', 'date', 'entry_type')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    amount REAL NOT NULL,
+    date TEXT NOT NULL,
+    description TEXT NOT NULL,
+    category TEXT NOT NULL,
+    trans_type TEXT NOT NULL,
+    day INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS ledger_entries (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    amount REAL NOT NULL,
+    description TEXT NOT NULL,
+    date TEXT NOT NULL,
+    entry_type TEXT NOT NULL
+);
+"""
+
+# Created after the day column, which databases from before it lacked.
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_transactions_day ON transactions (day);
+CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions (category, day);
+CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions (trans_type, day);
+CREATE INDEX IF NOT EXISTS idx_ledger_entries_name ON ledger_entries (name);
+"""
+
+# `day` is the date's ordinal (models.date_ordinal, 0 if not ISO), so date
+# bounds compare as the in-memory filter does rather than as strings.
+# py_lower is str.lower; SQLite's lower() only folds ASCII.
+FILTER_TERMS = (
+    ('category', 'category = ?'),
+    ('date_from', 'day >= ?'),
+    ('date_to', 'day <= ?'),
+    ('min_amount', 'amount >= ?'),
+    ('max_amount', 'amount <= ?'),
+    ('description', 'instr(py_lower(description), ?) > 0'),
+)
+TRANSACTIONS_SQL = 'SELECT ' + ', '.join(TRANSACTION_COLUMNS) + ' FROM transactions'
+LEDGER_ENTRIES_SQL = 'SELECT ' + ', '.join(LEDGER_ENTRY_COLUMNS) + ' FROM ledger_entries'
+MONTHLY_TOTALS_SQL = 'SELECT substr(date, 1, 7) AS month, trans_type, SUM(amount) AS total FROM transactions'
+PERSON_TOTALS_SQL = 'SELECT name, entry_type, SUM(amount) AS total FROM ledger_entries GROUP BY name, entry_type'
+
+
+class SqliteStore(Storage):
+    """
+    Stores the ledger in an SQLite database (stdlib sqlite3, WAL mode).
+
+    Each mutation becomes one INSERT/UPDATE/DELETE; with auto_sync off they
+    share a transaction until sync(). Reports can also run on the database
+    itself, without loading a manager (query_transactions, monthly_totals,
+    person_totals); they match the in-memory queries row for row.
+    """
+
+    def __init__(self, path: str, manager, read_only: bool = False):
+        from models import date_ordinal  # models imports this module
+        super().__init__(path, manager)
+        self._date_ordinal = date_ordinal
+        # sync() may run on a SaveScheduler thread; the lock serialises all use.
+        if read_only:
+            self.conn = sqlite3.connect(f'file:{quote(os.path.abspath(path))}?mode=ro', uri=True,
+                                        check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self.conn.row_factory = sqlite3.Row
+        self.conn.create_function('py_lower', 1, str.lower, deterministic=True)
+        if read_only:
+            self._read_only_schema()
+            return
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        columns = {row['name'] for row in self.conn.execute('PRAGMA table_info(transactions)')}
+        if 'day' not in columns:
+            with self.conn:
+                self.conn.create_function('date_ordinal', 1, date_ordinal, deterministic=True)
+                self.conn.execute('ALTER TABLE transactions ADD COLUMN day INTEGER NOT NULL DEFAULT 0')
+                self.conn.execute('UPDATE transactions SET day = date_ordinal(date)')
+        self.conn.executescript(INDEXES)
+
+    def _read_only_schema(self):
+        columns = {row['name'] for row in self.conn.execute('PRAGMA table_info(transactions)')}
+        if 'day' not in columns:
+            # A database from before the day column, which cannot be added
+            # here; a temporary view takes precedence over the table.
+            self.conn.create_function('date_ordinal', 1, self._date_ordinal, deterministic=True)
+            self.conn.execute('CREATE TEMP VIEW transactions AS SELECT *, date_ordinal(date) AS day '
+                              'FROM main.transactions')
+
+    def load(self):
+        self.manager.load_from_dict({
+            'transactions': [dict(row) for row in self.conn.execute(TRANSACTIONS_SQL + ' ORDER BY id')],
+            'ledger_entries': [dict(row) for row in self.conn.execute(LEDGER_ENTRIES_SQL + ' ORDER BY id')]
+        })
+
+    def append(self, op: str, fields: Dict):
+        with self._lock:
+            self._append(op, fields)
+        if self.auto_sync:
+            self.sync()
+
+    def _append(self, op: str, fields: Dict):
+        if op == 'add_transaction':
+            self._insert_transactions([fields['data']])
+        elif op == 'update_transaction':
+            self._insert_transactions([self.manager.get_transaction(fields['id']).to_dict()])
+        elif op == 'delete_transaction':
+            self.conn.execute('DELETE FROM transactions WHERE id = ?', (fields['id'],))
+        elif op == 'add_ledger_entry':
+            self._insert_ledger_entries([fields['data']])
+        elif op == 'update_ledger_entry':
+            self._insert_ledger_entries([self.manager.get_ledger_entry(fields['id']).to_dict()])
+        elif op == 'delete_ledger_entry':
+            self.conn.execute('DELETE FROM ledger_entries WHERE id = ?', (fields['id'],))
+        elif op == 'bulk_add':
+            self._insert_transactions(fields.get('transactions', []))
+            self._insert_ledger_entries(fields.get('ledger_entries', []))
+        else:
+            raise ValueError(f'Unknown operation: {op}')
+
+    def _insert_transactions(self, rows: List[Dict]):
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [tuple(row[c] for c in TRANSACTION_COLUMNS) + (self._date_ordinal(row['date']),) for row in rows]
+        )
+
+    def _insert_ledger_entries(self, rows: List[Dict]):
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO ledger_entries VALUES (?, ?, ?, ?, ?, ?)',
+            [tuple(row[c] for c in LEDGER_ENTRY_COLUMNS) for row in rows]
+        )
+
+    def save_all(self, data: Dict):
+        with self._lock, self.conn:
+            self.conn.execute('DELETE FROM transactions')
+            self.conn.execute('DELETE FROM ledger_entries')
+            self._insert_transactions(data.get('transactions', []))
+            self._insert_ledger_entries(data.get('ledger_entries', []))
+
+    @instrument.timed()
+    def sync(self):
+        with self._lock:
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def _where(self, criteria) -> tuple:
+        """
+        WHERE clause and parameters for a models.TransactionFilter. Only the
+        criteria in use appear, so SQLite can pick an index for them; the few
+        distinct texts stay in sqlite3's prepared statement cache.
+        """
+        terms, params = [], []
+        for field, term in FILTER_TERMS:
+            value = getattr(criteria, field)
+            if value is None or value == '':
+                continue
+            if field in ('date_from', 'date_to'):
+                value = self._date_ordinal(value)
+            terms.append(term)
+            params.append(value)
+        return (' WHERE ' + ' AND '.join(terms) if terms else ''), params
+
+    def query_transactions(self, criteria) -> List[Dict]:
+        """Rows matching a models.TransactionFilter, in id order."""
+        where, params = self._where(criteria)
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(TRANSACTIONS_SQL + where + ' ORDER BY id', params)]
+
+    def monthly_totals(self, criteria) -> Dict[str, Dict[str, float]]:
+        """Sums by yyyy-mm month and trans_type of the rows matching `criteria`."""
+        where, params = self._where(criteria)
+        totals = defaultdict(dict)
+        with self._lock:
+            for row in self.conn.execute(MONTHLY_TOTALS_SQL + where + ' GROUP BY month, trans_type', params):
+                totals[row['month']][row['trans_type']] = row['total']
+        return totals
+
+    def person_totals(self) -> Dict[str, Dict[str, float]]:
+        """Per-person ledger sums by entry_type, as LedgerManager.person_totals."""
+        totals = defaultdict(dict)
+        with self._lock:
+            for row in self.conn.execute(PERSON_TOTALS_SQL):
+                totals[row['name']][row['entry_type']] = row['total']
+        return dict(totals)
+
+
+class SaveScheduler(Storage):
+    """
+    Wraps another Storage and moves its sync() off the caller's thread.
+
+    append() still reaches the wrapped store immediately (a buffered write),
+    but the expensive part, fsync or a full rewrite, happens on a worker
+    thread once no change has arrived for `delay` seconds. A burst of edits
+    therefore costs one write. Changes never wait longer than `max_delay`.
+    sync() and close() write synchronously, for shutdown.
+    """
+
+    def __init__(self, store: Storage, delay: float = 0.5, max_delay: float = 5.0):
+        super().__init__(store.path, store.manager)
+        self.store = store
+        self.store.auto_sync = False
+        self.delay = delay
+        self.max_delay = max_delay
+        self.saves = 0
+        self._first_change: Optional[float] = None
+        self._last_change = 0.0
+        self._closed = False
+        self._wakeup = threading.Condition()
+        self._sync_lock = threading.Lock()
+        self._start()
+
+    @property
+    def error(self) -> Optional[Exception]:
+        """The failing background write, or else the wrapped store's own error."""
+        return self._error or self.store.error
+
+    @error.setter
+    def error(self, error: Optional[Exception]):
+        self._error = error
+
+    def load(self):
+        self.store.load()
+
+    def append(self, op: str, fields: Dict):
+        self.store.append(op, fields)
+        if self.auto_sync:
+            self.schedule()
+
+    def schedule(self):
+        """Request a background write after the debounce window."""
+        with self._wakeup:
+            self._last_change = time.monotonic()
+            if self._first_change is None:
+                self._first_change = self._last_change
+            self._wakeup.notify()
+
+    def save_all(self, data: Dict):
+        with self._sync_lock:
+            self.store.save_all(data)
+
+    def sync(self):
+        with self._wakeup:
+            self._first_change = None
+        try:
+            self._write()
+        except Exception:
+            self.schedule()  # still unsaved; the worker retries
+            raise
+
+    def close(self):
+        # The worker only stops once everything is written. If the final
+        # write fails it keeps saving in the background and close() can be
+        # tried again.
+        self.sync()
+        self._stop()
+        try:
+            self.store.close()
+        except Exception:
+            self._start()
+            self.schedule()
+            raise
+
+    def _start(self):
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name='save-scheduler', daemon=True)
+        self._worker.start()
+
+    def _stop(self):
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        self._worker.join()
+
+    def _write(self):
+        with self._sync_lock:
+            self.store.sync()
+            self.saves += 1
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                while not self._closed:
+                    if self._first_change is not None:
+                        due = min(self._last_change + self.delay, self._first_change + self.max_delay)
+                        if time.monotonic() >= due:
+                            break
+                        self._wakeup.wait(due - time.monotonic())
+                    else:
+                        self._wakeup.wait()
+                if self._closed:
+                    return
+                self._first_change = None
+            try:
+                self._write()
+                self.error = None
+            except Exception as e:
+                # Keep the data marked unsaved and try again after the next window.
+                self.error = e
+                self.schedule()
+
+
+BACKENDS = {
+    'json': JsonFileStore,
+    'journal': JournalStore,
+    'sqlite': SqliteStore
+}
+
+def backend_for(path: str) -> str:
+    return 'sqlite' if path.lower().endswith(SQLITE_SUFFIXES) else 'journal'
+
+def open_store(path: str, manager, backend: Optional[str] = None, read_only: bool = False) -> Storage:
+    """
+    Create the storage backend for `path`; SQLite for .db/.sqlite files, the
+    JSON journal otherwise. A `read_only` store is only for read() and never
+    creates or changes a file.
+    """
+    store_class = BACKENDS[backend or backend_for(path)]
+    if read_only and store_class is SqliteStore:
+        return SqliteStore(path, manager, read_only=True)
+    return store_class(path, manager)
+
+def data_exists(path: str) -> bool:
+    """True if `path` holds data for some backend; a journal store may have only its journal yet."""
+    return os.path.exists(path) or os.path.exists(path + '.journal')
+
+def migrate(source: str, destination: str, source_backend: Optional[str] = None,
+            destination_backend: Optional[str] = None):
+    """Copy all data from one store to another, replacing whatever the destination held."""
+    from models import LedgerManager
+    if not data_exists(source):
+        # Opening would create an empty store, which would then wipe the destination.
+        raise FileNotFoundError(f'No such data file: {source}')
+    manager = LedgerManager()
+    store = open_store(source, manager, source_backend, read_only=True)
+    try:
+        store.read()
+    finally:
+        store.close()
+    data = manager.to_dict()
+    target = open_store(destination, LedgerManager(), destination_backend)
+    target.save_all(data)
+    target.close()
+    return len(data['transactions']), len(data['ledger_entries'])
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert ledger data between storage backends.')
+    parser.add_argument('source')
+    parser.add_argument('destination')
+    parser.add_argument('--from', dest='source_backend', choices=sorted(BACKENDS))
+    parser.add_argument('--to', dest='destination_backend', choices=sorted(BACKENDS))
+    args = parser.parse_args()
+    try:
+        transactions, entries = migrate(args.source, args.destination, args.source_backend, args.destination_backend)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    print(f'Migrated {transactions} transactions and {entries} ledger entries to {args.destination}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import unittest
+
+import autotag
+
+
+class RuleMapTest(unittest.TestCase):
+    def setUp(self):
+        self.saved = dict(autotag.USER_KEYWORD_MAP)
+
+    def tearDown(self):
+        autotag.USER_KEYWORD_MAP.clear()
+        autotag.USER_KEYWORD_MAP.update(self.saved)
+
+    def test_every_mutation_retags(self):
+        rules = autotag.USER_KEYWORD_MAP
+        mutations = [
+            lambda: rules.__setitem__('zorbo', 'Games'),
+            lambda: rules.__ior__({'zorbo': 'Toys'}),
+            lambda: rules.update(zorbo='Books'),
+            lambda: rules.setdefault('quux', 'Misc'),
+            lambda: rules.pop('quux'),
+            lambda: rules.setdefault('quux', 'Misc'),
+            lambda: rules.popitem(),
+            lambda: rules.clear(),
+        ]
+        for mutate in mutations:
+            autotag.auto_tag_category('zorbo ticket')
+            before = rules.version
+            mutate()
+            self.assertGreater(rules.version, before)
+
+    def test_in_place_union_changes_tags(self):
+        autotag.USER_KEYWORD_MAP['zorbo'] = 'Games'
+        self.assertEqual(autotag.auto_tag_category('Zorbo ticket'), 'Games')
+        autotag.USER_KEYWORD_MAP |= {'zorbo': 'Toys'}
+        self.assertEqual(autotag.auto_tag_category('Zorbo ticket'), 'Toys')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import cli
+from models import LedgerManager, Transaction
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'data.json')
+        manager = LedgerManager()
+        manager.open_storage(self.path)
+        manager.add_transaction(Transaction(12.5, '2024-01-05', 'Pizza', 'Food', 'expense'))
+        manager.close()
+
+    def run_cli(self, *argv) -> str:
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(io.StringIO()):
+            cli.main(['--data', self.path] + list(argv))
+        return out.getvalue()
+
+    def test_dates_are_validated(self):
+        for argv in (['monthly', '--to', '2024-1-5'], ['filter', '--from', '2024-13-01']):
+            with self.assertRaises(SystemExit):
+                self.run_cli(*argv)
+        self.assertIn('Pizza', self.run_cli('filter', '--from', '20240105', '--to', '2024-01-05'))
+
+    def test_reports_do_not_write(self):
+        files = sorted(os.listdir(self.tmp.name))
+        self.run_cli('monthly')
+        self.run_cli('balances')
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), files)
+        self.path = os.path.join(self.tmp.name, 'typo.json')
+        with self.assertRaises(SystemExit):
+            self.run_cli('balances')
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), files)
+
+
+if __name__ == '__main__':
+    unittest.main()
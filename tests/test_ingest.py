@@ -0,0 +1,96 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import ingest
+import query
+from models import LedgerManager
+from utils import export_transactions_to_csv
+
+
+def write_statement(path: str, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Amount', 'Date', 'Description', 'Category', 'Type'])
+        writer.writerows(rows)
+
+
+def statement_rows(count: int):
+    rows = []
+    for i in range(count):
+        if i % 7 == 3:
+            description = f'Pizza "Hut"\nline two, with commas {i}'
+        elif i % 11 == 5:
+            description = f'"{i}"\n\n'
+        else:
+            description = f'Uber ride {i}'
+        amount = 'oops' if i % 13 == 9 else f'{i}.5'
+        rows.append([amount, f'2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}', description, '' if i % 2 else 'Food',
+                     'income' if i % 5 == 0 else 'expense'])
+    return rows
+
+
+def fields(manager: LedgerManager):
+    return [(t.amount, t.date, t.description, t.category, t.trans_type) for t in manager.transactions]
+
+
+class ChunkedIngestTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'statement.csv')
+        write_statement(self.path, statement_rows(60))
+
+    def test_chunks_cut_only_between_records(self):
+        size = os.path.getsize(self.path)
+        for chunk_bytes in (1, 7, 64, 500, size + 1):
+            chunks = ingest.chunk_offsets(self.path, chunk_bytes)
+            self.assertEqual(chunks[0][0], 0)
+            self.assertEqual(chunks[-1][1], size)
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            for (_, end, _), (start, _, line) in zip(chunks, chunks[1:]):
+                self.assertEqual(end, start)
+                self.assertEqual(data.count(b'"', 0, start) % 2, 0)
+                self.assertEqual(data[start - 1:start], b'\n')
+                self.assertEqual(line, data.count(b'\n', 0, start) + 1)
+
+    def test_matches_single_file_import(self):
+        expected = LedgerManager()
+        result = query.import_rows(expected, self.path, 'transactions')
+        for chunk_bytes in (1, 7, 64, 500):
+            for workers in (1, 2):
+                manager = LedgerManager()
+                ingested = ingest.ingest_files(manager, [self.path], workers=workers, dedupe=False,
+                                               chunk_bytes=chunk_bytes)
+                self.assertEqual(fields(manager), fields(expected), (chunk_bytes, workers))
+                self.assertEqual(ingested['errors'], [f'{self.path}: {error}' for error in result['errors']])
+
+    def test_overlapping_statements_are_deduplicated(self):
+        rows = statement_rows(30)
+        other = os.path.join(self.tmp.name, 'other.csv')
+        write_statement(self.path, rows[:20])
+        write_statement(other, rows[10:] + [rows[0]])
+        manager = LedgerManager()
+        ingest.ingest_files(manager, [self.path, other], workers=1, chunk_bytes=40)
+        expected = LedgerManager()
+        query.import_rows(expected, self.path, 'transactions')
+        write_statement(other, rows[20:])
+        query.import_rows(expected, other, 'transactions')
+        self.assertEqual(fields(manager), fields(expected))
+
+    def test_own_export_round_trips(self):
+        source = LedgerManager()
+        query.import_rows(source, self.path, 'transactions')
+        exported = os.path.join(self.tmp.name, 'export.csv')
+        export_transactions_to_csv(source.transactions, exported)
+        manager = LedgerManager()
+        self.assertEqual(query.import_rows(manager, exported, 'transactions')['errors'], [])
+        self.assertEqual(fields(manager), fields(source))
+        ingested = ingest.ingest_files(LedgerManager(), [exported], workers=1, dedupe=False, chunk_bytes=64)
+        self.assertEqual(ingested['errors'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import io
+import json
+import unittest
+
+from collections import defaultdict
+from datetime import date, timedelta
+
+from models import LedgerManager, Transaction, TransactionFilter, iter_json_object
+
+
+class IterJsonObjectTest(unittest.TestCase):
+    def test_numbers_split_across_chunks(self):
+        data = {'transactions': [{'amount': amount, 'id': i}
+                                 for i, amount in enumerate([2.0, 1.5e10, -3.25e-7, 12345, 0.5, 1e+21])],
+                'seq': 123456, 'rate': 1.5e-5}
+        text = json.dumps(data)
+        for chunk_size in range(1, 24):
+            parsed = {}
+            for key, value in iter_json_object(io.StringIO(text), chunk_size):
+                if key == 'transactions':
+                    parsed.setdefault(key, []).append(value)
+                else:
+                    parsed[key] = value
+            self.assertEqual(parsed, data, f'chunk_size={chunk_size}')
+
+
+class CategoriesTest(unittest.TestCase):
+    def test_categories_follow_edits(self):
+        manager = LedgerManager()
+        manager.bulk_add([Transaction(1.0, '2024-01-01', 'a', 'Rent', 'expense'),
+                          Transaction(2.0, '2024-02-01', 'b', 'Food', 'expense')])
+        food = manager.add_transaction(Transaction(3.0, '2024-03-01', 'c', 'Food', 'expense'))
+        self.assertEqual(manager.categories(), ['Food', 'Rent'])
+        manager.update_transaction(food, category='Gifts')
+        self.assertEqual(manager.categories(), ['Food', 'Gifts', 'Rent'])
+        rent = next(t.id for t in manager.transactions if t.category == 'Rent')
+        manager.delete_transaction(rent)
+        self.assertEqual(manager.categories(), ['Food', 'Gifts'])
+
+
+class DescriptionIndexTest(unittest.TestCase):
+    def test_leading_space_is_not_the_padding(self):
+        manager = LedgerManager()
+        manager.bulk_add([Transaction(1.0, '2024-01-01', 'Uber', 'Transport', 'expense'),
+                          Transaction(2.0, '2024-01-02', 'Late uber home', 'Transport', 'expense')])
+        index = manager.descriptions
+        self.assertEqual(index.lookup(' ub'), {2})
+        self.assertEqual(index.lookup('ub', prefix=True), {1, 2})
+        self.assertEqual(index.lookup('ube'), {1, 2})
+
+    def test_built_index_follows_edits(self):
+        manager = LedgerManager()
+        manager.bulk_add([Transaction(float(i), '2024-01-01', f'Pizza {i}', 'Food', 'expense') for i in range(20)])
+        self.assertIsNone(manager.descriptions.grams)  # built by the first lookup
+        manager.search('pizza')
+        first = manager.transactions[0].id
+        manager.update_transaction(first, description='Pasta bar')
+        manager.delete_transaction(manager.transactions[1].id)
+        manager.add_transaction(Transaction(1.0, '2024-01-02', 'Pizza hut', 'Food', 'expense'))
+        for text in ('pizza', 'past', ' hu', 'zza 1'):
+            expected = {t.id for t in manager.transactions if text in t.description.lower()}
+            self.assertEqual(manager.descriptions.lookup(text), expected, text)
+
+    def test_refining_uses_the_index(self):
+        manager = LedgerManager()
+        manager.bulk_add([Transaction(float(i), '2024-01-01', ('Pizza', 'Pasta', 'Épizza')[i % 3] + f' {i}',
+                                      ('Food', 'Rent')[i % 2], 'expense') for i in range(60)])
+        within = list(reversed(manager.filter_transactions(TransactionFilter(description='p'))[:25]))
+        criteria = TransactionFilter(description='PIZ', category='Food')
+        refined = manager.filter_transactions(criteria, within=within)
+        self.assertIsNotNone(manager.descriptions.grams)
+        self.assertEqual(refined, [t for t in within if criteria.matches(t)])
+
+
+
+class MonthlyTotalsTest(unittest.TestCase):
+    def test_partial_months_match_brute_force(self):
+        manager = LedgerManager()
+        start = date(2023, 12, 20)
+        manager.bulk_add([Transaction(float(i % 17) + 0.5, (start + timedelta(days=i * 3 % 120)).isoformat(),
+                                      f'item {i}', ('Food', 'Rent')[i % 2], ('income', 'expense')[i % 3 > 0])
+                          for i in range(300)])
+        manager.delete_transaction(manager.transactions[0].id)
+        windows = [(None, None), ('2024-01-01', '2024-01-31'), ('2024-01-15', None), (None, '2024-02-10'),
+                   ('2023-12-31', '2024-03-01'), ('2024-02-10', '2024-02-20'), ('2024-02-29', '2024-02-29'),
+                   ('2024-01-16', '2024-03-15'), ('2024-03-31', '2024-04-01')]
+        for date_from, date_to in windows:
+            for category in (None, 'Food'):
+                criteria = TransactionFilter(category=category, date_from=date_from, date_to=date_to)
+                expected = defaultdict(lambda: defaultdict(float))
+                for t in manager.transactions:
+                    if criteria.matches(t):
+                        expected[t.date[:7]][t.trans_type] += t.amount
+                totals = manager.monthly_totals(criteria)
+                self.assertEqual({month: set(cells) for month, cells in totals.items() if cells},
+                                 {month: set(cells) for month, cells in expected.items()},
+                                 (date_from, date_to, category))
+                for month, cells in expected.items():
+                    for trans_type, amount in cells.items():
+                        self.assertAlmostEqual(totals[month][trans_type], amount)
+
+
+if __name__ == '__main__':
+    unittest.main()
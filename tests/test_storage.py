@@ -0,0 +1,311 @@
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import query
+from models import LedgerManager, Transaction, TransactionFilter, PersonLedgerEntry
+from storage import JournalStore, SaveScheduler, SqliteStore, Storage, migrate
+
+
+def transaction(i: int) -> Transaction:
+    return Transaction(float(i), f'2024-01-{i % 28 + 1:02d}', f'item {i}', 'Food', 'expense')
+
+
+class JournalStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'data.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open(self, **options) -> LedgerManager:
+        manager = LedgerManager()
+        manager.storage = JournalStore(self.path, manager, **options)
+        manager.storage.load()
+        return manager
+
+    def reopen(self) -> LedgerManager:
+        manager = LedgerManager()
+        manager.open_storage(self.path)
+        self.addCleanup(manager.close)
+        return manager
+
+    @staticmethod
+    def wait_for_compaction(manager: LedgerManager):
+        if manager.storage._compactor is not None:
+            manager.storage._compactor.join()
+
+    def test_replay_after_crash(self):
+        manager = self.open()
+        ids = [manager.add_transaction(transaction(i)) for i in range(5)]
+        manager.update_transaction(ids[0], amount=99.0)
+        manager.delete_transaction(ids[1])
+        manager.add_ledger_entry(PersonLedgerEntry('Sam', 5.0, 'Lunch', '2024-01-02', 'to_give'))
+        # No close(): every append is already on disk.
+        self.assertEqual(self.reopen().to_dict(), manager.to_dict())
+
+    def test_torn_last_line_is_dropped(self):
+        manager = self.open()
+        manager.add_transaction(transaction(1))
+        manager.storage.close()
+        with open(self.path + '.journal', 'a', encoding='utf-8') as f:
+            f.write('{"seq": 2, "op": "add_tr')
+        reopened = self.reopen()
+        self.assertEqual(len(reopened.transactions), 1)
+        reopened.add_transaction(transaction(2))
+        reopened.close()
+        self.assertEqual(len(self.reopen().transactions), 2)
+
+    def test_compaction_folds_journal_into_snapshot(self):
+        manager = self.open(compact_threshold=5)
+        ids = [manager.add_transaction(transaction(i)) for i in range(4)]
+        manager.update_transaction(ids[2], description='changed')  # the fifth record triggers compaction
+        compacted = manager.to_dict()
+        manager.delete_transaction(ids[0])
+        self.wait_for_compaction(manager)
+        self.assertIsNone(manager.storage.error)
+        self.assertFalse(os.path.exists(self.path + '.journal.old'))
+        snapshot = LedgerManager()
+        self.assertEqual(snapshot.load_from_json(self.path)['seq'], 5)
+        self.assertEqual(snapshot.to_dict(), compacted)
+        self.assertEqual(self.reopen().to_dict(), manager.to_dict())
+
+    def test_failed_compactions_lose_nothing(self):
+        manager = self.open(compact_threshold=5)
+        with mock.patch('storage.write_json_atomic', side_effect=OSError('disk full')):
+            for i in range(12):
+                manager.add_transaction(transaction(i))
+                self.wait_for_compaction(manager)
+        self.assertIsInstance(manager.storage.error, OSError)
+        self.assertTrue(os.path.exists(self.path + '.journal.old'))
+        # Crash without closing, then recover.
+        self.assertEqual(self.reopen().to_dict(), manager.to_dict())
+
+    def test_bulk_import_compacts_by_size(self):
+        manager = self.open(compact_bytes=10000)
+        manager.bulk_add(transaction(i) for i in range(2000))
+        self.wait_for_compaction(manager)
+        self.assertEqual(os.path.getsize(self.path + '.journal'), 0)
+        self.assertEqual(len(self.reopen().transactions), 2000)
+
+    def test_read_changes_no_file(self):
+        manager = self.open(compact_threshold=5)
+        with mock.patch('storage.write_json_atomic', side_effect=OSError('disk full')):
+            for i in range(7):
+                manager.add_transaction(transaction(i))
+                self.wait_for_compaction(manager)
+        with open(self.path + '.journal', 'a', encoding='utf-8') as f:
+            f.write('{"seq": 8, "op": "add_tr')  # an append still in progress
+        files = {name: os.path.getsize(os.path.join(self.tmp.name, name)) for name in os.listdir(self.tmp.name)}
+        self.assertIn('data.json.journal.old', files)
+        self.assertEqual(query.open_source(self.path).to_dict(), manager.to_dict())
+        self.assertEqual({name: os.path.getsize(os.path.join(self.tmp.name, name))
+                          for name in os.listdir(self.tmp.name)}, files)
+
+    def test_file_without_ids_compacts(self):
+        # The format written before records had ids.
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'transactions': [{k: v for k, v in transaction(i).to_dict().items() if k != 'id'}
+                                        for i in range(3)],
+                       'ledger_entries': [{'name': 'Sam', 'amount': 5.0, 'description': 'Lunch',
+                                           'date': '2024-01-02', 'entry_type': 'to_give'}]}, f)
+        manager = self.open(compact_threshold=3)
+        for i in range(4):
+            manager.add_transaction(transaction(i))
+        self.wait_for_compaction(manager)
+        self.assertIsNone(manager.storage.error)
+        self.assertFalse(os.path.exists(self.path + '.journal.old'))
+        self.assertEqual(self.reopen().to_dict(), manager.to_dict())
+
+
+def sample(manager: LedgerManager):
+    descriptions = ['Éclair café', 'Pizza HUT', 'Uber', 'rent']
+    manager.bulk_add([Transaction(float(i) + 0.25, f'2024-{i % 3 + 1:02d}-{i % 28 + 1:02d}', descriptions[i % 4],
+                                  ['Food', 'Rent', 'Transport'][i % 3], 'income' if i % 5 == 0 else 'expense')
+                      for i in range(60)]
+                     + [Transaction(3.0, '2024-02-03T09:30', 'ÉCLAIR', 'Food', 'expense'),
+                        Transaction(4.0, '02/03/2024', 'odd date', 'Food', 'expense')],
+                     [PersonLedgerEntry(name, float(i), 'x', '2024-01-02', ('to_give', 'to_receive')[i % 2])
+                      for i, name in enumerate(['Sam', 'Ana', 'Sam', 'Ana', 'Li'])])
+
+
+class SqliteStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'data.db')
+        self.manager = LedgerManager()
+        self.manager.open_storage(self.path)
+        sample(self.manager)
+
+    def reopen(self) -> LedgerManager:
+        manager = LedgerManager()
+        manager.open_storage(self.path)
+        self.addCleanup(manager.close)
+        return manager
+
+    def test_edits_round_trip(self):
+        first, second = self.manager.transactions[:2]
+        self.manager.update_transaction(first.id, description='changed', date='2024-03-31')
+        self.manager.delete_transaction(second.id)
+        self.manager.delete_ledger_entry(self.manager.ledger_entries[0].id)
+        self.manager.close()
+        self.assertEqual(self.reopen().to_dict(), self.manager.to_dict())
+
+    def test_queries_match_the_manager(self):
+        self.manager.close()
+        store = SqliteStore(self.path, None)
+        self.addCleanup(store.close)
+        for criteria in (TransactionFilter(), TransactionFilter(category='Food'),
+                         TransactionFilter(date_from='2024-01-15', date_to='2024-02-10'),
+                         TransactionFilter(date_to='2024-02-03', category='Food'),
+                         TransactionFilter(min_amount=10, max_amount=30.25, description='éclair'),
+                         TransactionFilter(description='hut', date_from='2024-02-01T00:00')):
+            expected = query.filter_transactions(self.manager, criteria)
+            self.assertEqual([t.to_dict() for t in query.filter_transactions(store, criteria)],
+                             [t.to_dict() for t in expected])
+            summary = query.monthly_summary(store, criteria)
+            expected = query.monthly_summary(self.manager, criteria)
+            self.assertEqual(list(summary), list(expected))
+            for month, totals in expected.items():
+                for trans_type, total in totals.items():
+                    self.assertAlmostEqual(summary[month][trans_type], total)
+        self.assertEqual(query.ledger_balances(store), query.ledger_balances(self.manager))
+
+    def test_database_without_day_column_is_upgraded(self):
+        self.manager.close()
+        conn = sqlite3.connect(self.path)
+        with conn:
+            conn.execute('DROP TABLE transactions')
+            conn.execute('CREATE TABLE transactions (id INTEGER PRIMARY KEY, amount REAL NOT NULL, '
+                         'date TEXT NOT NULL, description TEXT NOT NULL, category TEXT NOT NULL, '
+                         'trans_type TEXT NOT NULL)')
+            conn.executemany('INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?)',
+                             [(t.id, t.amount, t.date, t.description, t.category, t.trans_type)
+                              for t in self.manager.transactions])
+        conn.close()
+        store = SqliteStore(self.path, None)
+        self.addCleanup(store.close)
+        criteria = TransactionFilter(date_from='2024-02-01', date_to='2024-02-29')
+        self.assertEqual([t.to_dict() for t in query.filter_transactions(store, criteria)],
+                         [t.to_dict() for t in query.filter_transactions(self.manager, criteria)])
+
+
+class CountingStore(Storage):
+    """Counts syncs; raises OSError from them while `failing` is set."""
+
+    def __init__(self):
+        super().__init__('counting', None)
+        self.syncs = 0
+        self.failing = False
+
+    def append(self, op, fields):
+        pass
+
+    def sync(self):
+        if self.failing:
+            raise OSError('disk full')
+        self.syncs += 1
+
+    def close(self):
+        self.sync()
+
+
+class SaveSchedulerTest(unittest.TestCase):
+    def scheduler(self, delay: float, max_delay: float = 5.0) -> SaveScheduler:
+        scheduler = SaveScheduler(CountingStore(), delay, max_delay)
+        self.addCleanup(lambda: scheduler._stop())
+        return scheduler
+
+    @staticmethod
+    def wait_until(condition, timeout: float = 5.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def test_burst_is_written_once(self):
+        scheduler = self.scheduler(delay=0.2)
+        for _ in range(5):
+            scheduler.append('add_transaction', {})
+            time.sleep(0.02)
+        self.assertEqual(scheduler.store.syncs, 0)
+        self.assertTrue(self.wait_until(lambda: scheduler.store.syncs))
+        time.sleep(0.3)
+        self.assertEqual(scheduler.store.syncs, 1)
+
+    def test_max_delay_bounds_a_long_burst(self):
+        scheduler = self.scheduler(delay=0.2, max_delay=0.3)
+        started = time.monotonic()
+        while time.monotonic() - started < 1.0:
+            scheduler.append('add_transaction', {})
+            time.sleep(0.02)
+        self.assertGreaterEqual(scheduler.store.syncs, 2)
+
+    def test_failed_write_is_retried(self):
+        scheduler = self.scheduler(delay=0.05)
+        scheduler.store.failing = True
+        scheduler.append('add_transaction', {})
+        self.assertTrue(self.wait_until(lambda: scheduler.error is not None))
+        scheduler.store.failing = False
+        self.assertTrue(self.wait_until(lambda: scheduler.store.syncs))
+        self.assertIsNone(scheduler.error)
+
+    def test_failed_close_keeps_saving_in_the_background(self):
+        scheduler = self.scheduler(delay=0.05)
+        scheduler.append('add_transaction', {})
+        scheduler.store.failing = True
+        with self.assertRaises(OSError):
+            scheduler.close()
+        scheduler.store.failing = False
+        self.assertTrue(self.wait_until(lambda: scheduler.store.syncs))
+        syncs = scheduler.store.syncs
+        scheduler.append('add_transaction', {})  # an edit made after answering "No" to quitting
+        self.assertTrue(self.wait_until(lambda: scheduler.store.syncs > syncs))
+        scheduler.close()
+        self.assertFalse(scheduler._worker.is_alive())
+
+
+class MigrateTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmp.name, name)
+
+    def test_round_trip_through_sqlite(self):
+        manager = LedgerManager()
+        manager.open_storage(self.path('data.json'))
+        sample(manager)
+        manager.close()
+        self.assertEqual(migrate(self.path('data.json'), self.path('data.db')), (62, 5))
+        self.assertEqual(migrate(self.path('data.db'), self.path('copy.json')), (62, 5))
+        copy = LedgerManager()
+        copy.open_storage(self.path('copy.json'))
+        self.addCleanup(copy.close)
+        self.assertEqual(copy.to_dict(), manager.to_dict())
+
+    def test_missing_source_leaves_destination_alone(self):
+        manager = LedgerManager()
+        manager.open_storage(self.path('data.db'))
+        sample(manager)
+        manager.close()
+        with self.assertRaises(FileNotFoundError):
+            migrate(self.path('typo.json'), self.path('data.db'))
+        self.assertEqual(os.listdir(self.tmp.name), ['data.db'])
+        reopened = LedgerManager()
+        reopened.open_storage(self.path('data.db'))
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.to_dict(), manager.to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
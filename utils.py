@@ -1,31 +1,131 @@
 import csv
-from typing import List
+import gzip
+import os
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from models import Transaction, PersonLedgerEntry
+from autotag import auto_tag_many
 
-def export_transactions_to_csv(transactions: List[Transaction], file_path: str):
-    with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['Amount', 'Date', 'Description', 'Category', 'Type'])
-        for t in transactions:
-            writer.writerow([t.amount, t.date, t.description, t.category, t.trans_type])
-        total_income = sum(t.amount for t in transactions if t.trans_type == 'income')
-        total_expense = sum(t.amount for t in transactions if t.trans_type == 'expense')
-        net = total_income - total_expense
-        writer.writerow([])
-        writer.writerow(['Total Income', total_income])
-        writer.writerow(['Total Expense', total_expense])
-        writer.writerow(['Net Balance', net])
-
-def export_ledger_to_csv(entries: List[PersonLedgerEntry], file_path: str):
-    with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['Name', 'Amount', 'Description', 'Date', 'Type'])
-        for e in entries:
-            writer.writerow([e.name, e.amount, e.description, e.date, e.entry_type])
-        writer.writerow([])
-        total_to_give = sum(e.amount for e in entries if e.entry_type == 'to_give')
-        total_to_receive = sum(e.amount for e in entries if e.entry_type == 'to_receive')
-        net = total_to_receive - total_to_give
-        writer.writerow(['Total To Give', total_to_give])
-        writer.writerow(['Total To Receive', total_to_receive])
-        writer.writerow(['Net Balance', net]) 
\ No newline at end of file
+# Rows handed to the csv writer at a time by the exporters.
+EXPORT_CHUNK_ROWS = 5000
+
+def _open_export(file_path: str, compress: Optional[bool]):
+    """Text file for an export; gzip when `compress` is set or, by default, for .gz paths."""
+    if compress is None:
+        compress = file_path.endswith('.gz')
+    if compress:
+        return gzip.open(file_path, 'wt', compresslevel=6, encoding='utf-8', newline='')
+    return open(file_path, 'w', newline='', encoding='utf-8', buffering=1 << 20)
+
+def _write_csv(file_path: str, header: List[str], records: Iterable, row: Callable[[object], tuple],
+               add_totals: Callable[[list], None], footer: Callable[[], List[list]],
+               compress: Optional[bool], progress: Optional[Callable[[int], None]]) -> int:
+    """
+    Stream `records` to `file_path` as row(record) lines, EXPORT_CHUNK_ROWS
+    at a time, then the rows from footer(). `add_totals` sees each chunk
+    once it is written, so totals need no second pass. `progress` receives
+    the number of rows written so far after every chunk.
+    """
+    count = 0
+    records = iter(records)
+    with _open_export(file_path, compress) as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        while True:
+            chunk = list(islice(records, EXPORT_CHUNK_ROWS))
+            if not chunk:
+                break
+            writer.writerows(map(row, chunk))
+            add_totals(chunk)
+            count += len(chunk)
+            if progress is not None:
+                progress(count)
+        writer.writerows(footer())
+    return count
+
+def export_transactions_to_csv(transactions: Iterable[Transaction], file_path: str, compress: Optional[bool] = None,
+                               progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Write transactions followed by income, expense and net totals, in one
+    pass over any iterable (e.g. a generator over a query). Returns the
+    number of transactions written.
+    """
+    totals = {'income': 0, 'expense': 0}
+
+    def add_totals(chunk):
+        for kind, total in totals.items():
+            totals[kind] = sum((t.amount for t in chunk if t.trans_type == kind), total)
+
+    def footer():
+        return [[], ['Total Income', totals['income']], ['Total Expense', totals['expense']],
+                ['Net Balance', totals['income'] - totals['expense']]]
+
+    return _write_csv(file_path, ['Amount', 'Date', 'Description', 'Category', 'Type'], transactions,
+                      lambda t: (t.amount, t.date, t.description, t.category, t.trans_type),
+                      add_totals, footer, compress, progress)
+
+def export_ledger_to_csv(entries: Iterable[PersonLedgerEntry], file_path: str, compress: Optional[bool] = None,
+                         progress: Optional[Callable[[int], None]] = None) -> int:
+    """Ledger counterpart of export_transactions_to_csv, with to give, to receive and net totals."""
+    totals = {'to_give': 0, 'to_receive': 0}
+
+    def add_totals(chunk):
+        for kind, total in totals.items():
+            totals[kind] = sum((e.amount for e in chunk if e.entry_type == kind), total)
+
+    def footer():
+        return [[], ['Total To Give', totals['to_give']], ['Total To Receive', totals['to_receive']],
+                ['Net Balance', totals['to_receive'] - totals['to_give']]]
+
+    return _write_csv(file_path, ['Name', 'Amount', 'Description', 'Date', 'Type'], entries,
+                      lambda e: (e.name, e.amount, e.description, e.date, e.entry_type),
+                      add_totals, footer, compress, progress)
+
+# First cells of the totals rows the exporters append after the records.
+FOOTER_LABELS = frozenset(('Total Income', 'Total Expense', 'Total To Give', 'Total To Receive', 'Net Balance'))
+
+def is_export_footer(row: Dict[str, str]) -> bool:
+    """True for a totals row written by the exporters: a label and a value, nothing else."""
+    values = list(row.values())
+    return values[0] in FOOTER_LABELS and not any(values[2:])
+
+def transaction_from_csv_row(row: Dict[str, str]) -> Transaction:
+    return Transaction(float(row['Amount']), row['Date'], row['Description'], row['Category'], row['Type'])
+
+def tag_uncategorized(transactions: List[Transaction]) -> List[Transaction]:
+    """Fill in blank categories in place using the auto-tagger."""
+    untagged = [t for t in transactions if not t.category]
+    for t, category in zip(untagged, auto_tag_many(t.description for t in untagged)):
+        t.category = category
+    return transactions
+
+def ledger_entry_from_csv_row(row: Dict[str, str]) -> PersonLedgerEntry:
+    return PersonLedgerEntry(row['Name'], float(row['Amount']), row['Description'], row['Date'], row['Type'])
+
+def iter_csv_records(file_path: str, parse_row: Callable[[Dict[str, str]], object],
+                     progress: Optional[Callable[[int], None]] = None) -> Iterator[Tuple[int, Optional[object], Optional[str]]]:
+    """
+    Lazily parse a CSV export, one row at a time.
+    Yields (line_number, record, error) for every data row; exactly one of
+    record and error is None. The totals rows of the app's own exports are
+    skipped. `progress` receives the percentage of the file read so far,
+    every 1000 rows.
+    """
+    size = os.path.getsize(file_path) or 1
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        for count, row in enumerate(reader, 1):
+            if is_export_footer(row):
+                continue
+            try:
+                record = parse_row(row)
+            except KeyError as e:
+                yield reader.line_num, None, f'missing column {e}'
+            except Exception as e:
+                yield reader.line_num, None, str(e)
+            else:
+                yield reader.line_num, record, None
+            if progress is not None and count % 1000 == 0:
+                progress(min(100, f.buffer.tell() * 100 // size))
+    if progress is not None:
+        progress(100)